@@ -0,0 +1,6 @@
+"""Headless micro-benchmarks for the training hot paths.
+
+Run the whole seeded suite with ``python -m bench.run`` (see bench/run.py),
+or a single benchmark from the repository root with
+``python -m bench.<module>``; each prints its results as JSON.
+"""
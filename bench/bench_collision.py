@@ -0,0 +1,71 @@
+"""play_step + get_state cost as the snake grows.
+
+The snake follows a Hamiltonian cycle of the board so it never dies; with the
+occupancy grid the per-step cost should stay flat as the length increases.
+"""
+import random
+import time
+from collections import deque
+
+from snake_game import SnakeGame, Direction, Point, BLOCK_SIZE
+from dqn_agent import Agent
+from bench.common import emit
+
+CLOCK_WISE = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
+ACTIONS = {0: [1, 0, 0], 1: [0, 1, 0], 3: [0, 0, 1]}
+
+def hamiltonian_cycle(cols, rows):
+    """Cells (x, y) of a cycle covering the board; rows must be even"""
+    cycle = [(x, 0) for x in range(cols)]
+    for y in range(1, rows):
+        xs = range(cols - 1, 0, -1) if y % 2 else range(1, cols)
+        cycle.extend((x, y) for x in xs)
+    cycle.extend((0, y) for y in range(rows - 1, 0, -1))
+    return cycle
+
+def _direction(a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    return {(1, 0): Direction.RIGHT, (-1, 0): Direction.LEFT,
+            (0, 1): Direction.DOWN, (0, -1): Direction.UP}[(dx, dy)]
+
+def make_game(length, seed=0):
+    """A headless game whose snake of the given length lies on the cycle"""
+    game = SnakeGame(render=False, seed=seed)
+    cycle = hamiltonian_cycle(game.cols, game.rows)
+    body = [cycle[i % len(cycle)] for i in range(length - 1, -1, -1)]
+    game.snake = deque(Point(x * BLOCK_SIZE, y * BLOCK_SIZE) for x, y in body)
+    game.head = game.snake[0]
+    game.direction = _direction(body[1], body[0])
+    game._rebuild_occupancy()
+    game._place_food()
+    return game, cycle
+
+def steps_per_second(length, steps=5000, seed=0):
+    game, cycle = make_game(length, seed)
+    agent = Agent()
+    index = {cell: i for i, cell in enumerate(cycle)}
+    start = time.perf_counter()
+    for _ in range(steps):
+        head = (game.head.x // BLOCK_SIZE, game.head.y // BLOCK_SIZE)
+        nxt = cycle[(index[head] + 1) % len(cycle)]
+        turn = (CLOCK_WISE.index(_direction(head, nxt)) - CLOCK_WISE.index(game.direction)) % 4
+        agent.get_state(game)
+        game.frame_iteration = 0  # never time out
+        reward, done, score, _ = game.play_step(ACTIONS[turn])
+        agent.get_state(game)
+        assert not done
+    elapsed = time.perf_counter() - start
+    return steps / elapsed, len(game.snake)
+
+def run(seed=0, quick=False):
+    random.seed(seed)
+    steps = 1000 if quick else 5000
+    results = {}
+    for length in (3, 50, 200, 400, 600):
+        rate, final_length = steps_per_second(length, steps, seed)
+        results[f'length_{length}'] = {'steps_per_sec': round(rate, 1),
+                                       'final_length': final_length}
+    return {'collision': results}
+
+if __name__ == '__main__':
+    emit(run())
@@ -0,0 +1,58 @@
+"""Games and wall-clock seconds until the mean score of the last WINDOW games
+reaches THRESHOLD, for each bootstrap-target mode of QTrainer.
+
+Each configuration trains a headless, seeded agent from scratch in a
+temporary model directory. This takes minutes, so bench.run only includes it
+when asked (--only convergence).
+"""
+import contextlib
+import io
+import tempfile
+
+import numpy as np
+
+from metrics import load_metrics
+from train import train
+from bench.common import emit
+
+THRESHOLD = 20
+WINDOW = 20
+CONFIGS = {
+    'online': {},
+    'hard_500': {'target_update': 500},
+    'polyak_0.005': {'tau': 0.005},
+    'double_hard_500': {'target_update': 500, 'double': True},
+}
+
+def games_to_threshold(metrics):
+    """(games, seconds) until the rolling mean first reaches THRESHOLD, or Nones"""
+    scores = metrics['score'].astype(np.float64)
+    if len(scores) < WINDOW:
+        return None, None
+    rolling = np.convolve(scores, np.ones(WINDOW) / WINDOW, mode='valid')
+    hits = np.flatnonzero(rolling >= THRESHOLD)
+    if not len(hits):
+        return None, None
+    game = int(hits[0]) + WINDOW
+    return game, float(metrics['time'][game - 1] - metrics['time'][0])
+
+def run(seed=0, quick=False):
+    max_games = 80 if quick else 250
+    seeds = [seed] if quick else [seed, seed + 1]
+    results = {'threshold': THRESHOLD, 'window': WINDOW, 'max_games': max_games}
+    for name, config in CONFIGS.items():
+        runs = []
+        for s in seeds:
+            with tempfile.TemporaryDirectory() as model_dir, contextlib.redirect_stdout(io.StringIO()):
+                train(render=False, dashboard='none', model_dir=model_dir, save_checkpoints=False,
+                      persist_memory=False, max_games=max_games, seed=s, **config)
+                metrics = load_metrics(f'{model_dir}/metrics.bin')
+                games, seconds = games_to_threshold(metrics)
+                runs.append({'seed': s, 'games_to_threshold': games,
+                             'seconds_to_threshold': None if seconds is None else round(seconds, 1),
+                             'final_mean': round(float(metrics['score'][-WINDOW:].mean()), 2)})
+        results[name] = runs
+    return {'convergence': results}
+
+if __name__ == '__main__':
+    emit(run())
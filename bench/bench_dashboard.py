@@ -0,0 +1,50 @@
+"""Games/sec of a headless game loop with the dashboard disabled, throttled
+(the default 2 Hz redraw), redrawn after every game, and running in its own
+process behind a DashboardServer.
+
+Uses matplotlib's Agg backend so it runs without a display.
+"""
+import os
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import random
+import time
+
+from snake_game import SnakeGame
+from bench.common import emit
+
+def games_per_second(visualizer, seconds, seed=0):
+    rng = random.Random(seed)
+    game = SnakeGame(render=False, seed=seed)
+    games = total = record = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        move = [0, 0, 0]
+        move[rng.choice((0, 0, 0, 1, 2))] = 1
+        reward, done, score, _ = game.play_step(move)
+        if done:
+            game.reset()
+            games += 1
+            total += score
+            record = max(record, score)
+            if visualizer is not None:
+                visualizer.update(games, score, total / games, record, 0, games * 50)
+    return games / (time.perf_counter() - start)
+
+def run(seed=0, quick=False):
+    from visualizer import TrainingVisualizer
+    seconds = 1.0 if quick else 5.0
+    results = {'disabled': round(games_per_second(None, seconds, seed), 1)}
+    for name, max_fps in (('throttled_2hz', 2.0), ('every_game', None)):
+        visualizer = TrainingVisualizer(max_fps=max_fps)
+        results[name] = round(games_per_second(visualizer, seconds, seed), 1)
+        visualizer.close()
+    from dashboard import DashboardServer
+    server = DashboardServer(port=0)
+    server.spawn_viewer()
+    results['out_of_process'] = round(games_per_second(server, seconds, seed), 1)
+    server.close()
+    return {'dashboard_games_per_sec': results}
+
+if __name__ == '__main__':
+    emit(run())
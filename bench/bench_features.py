@@ -0,0 +1,86 @@
+"""State featurization: features.py vs the original Agent.get_state.
+
+Also checks that both produce the same 11 features on every visited state.
+"""
+import random
+
+import numpy as np
+
+from features import game_features, batch_features
+from snake_game import SnakeGame, Direction, Point
+from vector_env import VectorSnakeEnv
+from bench.common import per_call, emit
+
+def legacy_get_state(game):
+    """The original Agent.get_state: Points, is_collision calls and bool chains"""
+    head = game.snake[0]
+    point_l = Point(head.x - 20, head.y)
+    point_r = Point(head.x + 20, head.y)
+    point_u = Point(head.x, head.y - 20)
+    point_d = Point(head.x, head.y + 20)
+
+    dir_l = game.direction == Direction.LEFT
+    dir_r = game.direction == Direction.RIGHT
+    dir_u = game.direction == Direction.UP
+    dir_d = game.direction == Direction.DOWN
+    food = game.food if game.food is not None else head
+
+    state = [
+        (dir_r and game.is_collision(point_r)) or
+        (dir_l and game.is_collision(point_l)) or
+        (dir_u and game.is_collision(point_u)) or
+        (dir_d and game.is_collision(point_d)),
+
+        (dir_u and game.is_collision(point_r)) or
+        (dir_d and game.is_collision(point_l)) or
+        (dir_l and game.is_collision(point_u)) or
+        (dir_r and game.is_collision(point_d)),
+
+        (dir_d and game.is_collision(point_r)) or
+        (dir_u and game.is_collision(point_l)) or
+        (dir_r and game.is_collision(point_u)) or
+        (dir_l and game.is_collision(point_d)),
+
+        dir_l, dir_r, dir_u, dir_d,
+
+        food.x < game.head.x,
+        food.x > game.head.x,
+        food.y < game.head.y,
+        food.y > game.head.y,
+    ]
+    return np.array(state, dtype=int)
+
+def check_layout(steps, seed=0):
+    """Play random games and compare both featurizers at every step"""
+    rng = random.Random(seed)
+    game = SnakeGame(render=False, seed=seed)
+    for _ in range(steps):
+        assert np.array_equal(game_features(game), legacy_get_state(game))
+        move = [0, 0, 0]
+        move[rng.choice((0, 0, 0, 1, 2))] = 1
+        if game.play_step(move)[1]:
+            assert np.array_equal(game_features(game), legacy_get_state(game))
+            game.reset()
+    return steps
+
+def run(seed=0, quick=False):
+    checked = check_layout(2000 if quick else 20000, seed)
+    repeat = 2000 if quick else 20000
+    game = SnakeGame(render=False, seed=seed)
+    legacy = per_call(legacy_get_state, repeat, game)
+    fast = per_call(game_features, repeat, game)
+
+    env = VectorSnakeEnv(4096, seed=seed)
+    args = (env.head_x, env.head_y, env.direction, env.food % env.cols,
+            env.food // env.cols, env.occupied, env.cols, env.rows)
+    batch = per_call(batch_features, 20 if quick else 200, *args)
+    return {'features': {
+        'states_checked': checked,
+        'legacy_get_state_us': round(legacy * 1e6, 3),
+        'game_features_us': round(fast * 1e6, 3),
+        'speedup': round(legacy / fast, 1),
+        'batch_4096_us_per_board': round(batch / 4096 * 1e6, 4),
+    }}
+
+if __name__ == '__main__':
+    emit(run())
@@ -0,0 +1,86 @@
+"""Linear_QNet forward passes per FORWARD_MODES (see compile_forward): latency
+at batch sizes 1 (get_action), 64 (a scheduled update) and 1000, the cost of
+a train_step, agreement with eager outputs, and PyTorch thread counts."""
+import copy
+import os
+import random
+import time
+import warnings
+
+import torch
+
+from dqn_agent import Linear_QNet, QTrainer, FORWARD_MODES, TRAIN_BATCH_SIZE, compile_forward
+from bench.common import per_call, emit
+from bench.bench_train_step import make_batch, max_param_diff
+
+BATCH_SIZES = (1, TRAIN_BATCH_SIZE, 1000)
+
+def _forward_us(forward, x, repeat):
+    with torch.inference_mode():
+        return round(per_call(forward, repeat, x) * 1e6, 2)
+
+def _train_args(batch_size, seed):
+    states, actions, rewards, next_states, dones = make_batch(batch_size, seed)
+    return states, actions.argmax(axis=1), rewards, next_states, torch.tensor(dones)
+
+def run(seed=0, quick=False):
+    random.seed(seed)
+    torch.manual_seed(seed)
+    repeat = 200 if quick else 2000
+    model = Linear_QNet(11, 256, 3)
+    inputs = {b: torch.randint(0, 2, (b, 11)).float() for b in BATCH_SIZES}
+    with torch.inference_mode():
+        expected = {b: model(x) for b, x in inputs.items()}
+    train_args = _train_args(TRAIN_BATCH_SIZE, seed)
+
+    modes = {}
+    for mode in FORWARD_MODES:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # TorchScript's deprecation notice
+            start = time.perf_counter()
+            forward = compile_forward(model, mode)
+            with torch.inference_mode():
+                max_diff = max((forward(x) - expected[b]).abs().max().item()
+                               for b, x in inputs.items())
+            warmup = time.perf_counter() - start
+            result = {'warmup_s': round(warmup, 3), 'max_abs_diff_vs_eager': max_diff}
+            for b, x in inputs.items():
+                n = repeat if b < 1000 else repeat // 10
+                result[f'batch_{b}_us'] = _forward_us(forward, x, n)
+
+            # Training through the mode must take the same steps as eager
+            trained = copy.deepcopy(model)
+            trainer = QTrainer(trained, lr=0.001, gamma=0.9,
+                               forward=compile_forward(trained, mode))
+            reference = copy.deepcopy(model)
+            eager = QTrainer(reference, lr=0.001, gamma=0.9)
+            for _ in range(3):
+                trainer.train_step(*train_args)
+                eager.train_step(*train_args)
+            result['max_param_diff_vs_eager'] = max_param_diff(trained, reference)
+            result[f'train_step_{TRAIN_BATCH_SIZE}_us'] = round(
+                per_call(trainer.train_step, repeat // 4, *train_args) * 1e6, 1)
+        modes[mode] = result
+    for mode in FORWARD_MODES:
+        modes[mode]['speedup_batch_1'] = round(modes['eager']['batch_1_us'] / modes[mode]['batch_1_us'], 2)
+
+    # Thread counts up to the machine's cores, with the default mode
+    default_threads = torch.get_num_threads()
+    threads = {}
+    forward = compile_forward(model)
+    trainer = QTrainer(copy.deepcopy(model), lr=0.001, gamma=0.9)
+    n = 1
+    while n <= (os.cpu_count() or 1):
+        torch.set_num_threads(n)
+        threads[f'threads_{n}'] = {
+            'batch_1_us': _forward_us(forward, inputs[1], repeat),
+            'batch_1000_us': _forward_us(forward, inputs[1000], repeat // 10),
+            f'train_step_{TRAIN_BATCH_SIZE}_us': round(
+                per_call(trainer.train_step, repeat // 4, *train_args) * 1e6, 1),
+        }
+        n *= 2
+    torch.set_num_threads(default_threads)
+    return {'forward': {'modes': modes, 'threads': threads}}
+
+if __name__ == '__main__':
+    emit(run())
@@ -0,0 +1,44 @@
+"""Action selection: per-call latency of get_action vs batched get_actions."""
+import random
+import time
+
+import numpy as np
+import torch
+
+from dqn_agent import Agent
+from vector_env import VectorSnakeEnv
+from bench.common import per_call, emit
+
+def run(seed=0, quick=False):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    repeat = 200 if quick else 2000
+    agent = Agent(max_memory=1)
+    agent.n_games = 1000  # greedy: always run the network
+    state = np.random.randint(0, 2, 11)
+
+    results = {
+        'get_action_us': round(per_call(agent.get_action, repeat, state) * 1e6, 2),
+    }
+    for batch in (1, 64, 1024, 4096):
+        states = np.random.randint(0, 2, (batch, 11)).astype(np.float32)
+        n = max(10, repeat // max(1, batch // 64))
+        latency = per_call(agent.get_actions, n, states)
+        results[f'get_actions_batch_{batch}'] = {
+            'latency_us': round(latency * 1e6, 2),
+            'actions_per_sec': round(batch / latency, 1),
+        }
+
+    # Acting loop over many games: one forward pass per step of all boards
+    env = VectorSnakeEnv(1024, seed=seed)
+    states = env.reset()
+    steps = 50 if quick else 200
+    start = time.perf_counter()
+    for _ in range(steps):
+        states, rewards, dones, scores = env.step(agent.get_actions(states))
+    results['vector_env_acting_steps_per_sec'] = round(1024 * steps / (time.perf_counter() - start), 1)
+    return {'get_action': results}
+
+if __name__ == '__main__':
+    emit(run())
@@ -0,0 +1,76 @@
+"""Cold-start cost: import time of each module in a fresh interpreter (and
+whether it drags in pygame, matplotlib or torch), and how long a pool of
+headless workers takes to start and import train, with spawn vs the
+forkserver context of core.worker_context."""
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from core import worker_context
+from bench.common import emit
+
+MODULES = ('core', 'snake_game', 'features', 'vector_env', 'replay_buffer', 'dqn_agent',
+           'train', 'visualizer', 'dashboard', 'sweep')
+HEAVY = ('pygame', 'matplotlib', 'torch')
+WORKERS = 4
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+def import_time(module, repeat):
+    """Median seconds to import module in a new interpreter, and the heavy
+    packages it loaded"""
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY)],
+                             capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        seconds, loaded = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(seconds)
+    return statistics.median(times), loaded
+
+def _ready(hold):
+    # What a sweep trial imports before it can train
+    import train
+    ready = time.time()
+    time.sleep(hold)  # keeps this worker busy so every task gets its own process
+    return os.getpid(), ready
+
+def pool_start(ctx, workers=WORKERS):
+    """Seconds until all workers processes of a new pool have imported train,
+    and how many distinct workers reported"""
+    start = time.time()
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+        results = list(pool.map(_ready, [0.2] * workers))
+    return max(ready for _, ready in results) - start, len({pid for pid, _ in results})
+
+def run(seed=0, quick=False):
+    repeat = 1 if quick else 3
+    imports = {}
+    for module in MODULES:
+        seconds, loaded = import_time(module, repeat)
+        imports[module] = {'ms': round(seconds * 1e3, 1), 'loads': loaded}
+
+    pools = {}
+    spawn, n = pool_start(multiprocessing.get_context('spawn'))
+    pools['spawn_s'] = round(spawn, 3)
+    ctx = worker_context(preload=['train'])
+    # The first pool also starts the forkserver, which imports train once
+    first, _ = pool_start(ctx)
+    again, _ = pool_start(ctx)
+    pools[f'{ctx.get_start_method()}_first_s'] = round(first, 3)
+    pools[f'{ctx.get_start_method()}_s'] = round(again, 3)
+    pools['workers'] = n
+    return {'import': {'modules': imports, 'pool_start': pools}}
+
+if __name__ == '__main__':
+    emit(run())
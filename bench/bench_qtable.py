@@ -0,0 +1,55 @@
+"""Greedy action selection from the Q-value table (qtable.py) vs a forward
+pass: per-call latency of get_action and get_actions, the cost of rebuilding
+the table, and agreement with the network on every reachable state."""
+import os
+import random
+import tempfile
+
+import numpy as np
+import torch
+
+from dqn_agent import Agent
+from features import UNPACK_TABLE
+from qtable import REACHABLE_CODES, QTablePolicy
+from bench.common import per_call, emit
+
+BATCH = 64
+
+def run(seed=0, quick=False):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    repeat = 500 if quick else 5000
+    rng = np.random.default_rng(seed)
+    states = UNPACK_TABLE[rng.choice(REACHABLE_CODES, BATCH)]
+
+    network = Agent(max_memory=1)
+    table = Agent(max_memory=1, qtable_every=1000)
+    table.model.load_state_dict(network.model.state_dict())
+    for agent in (network, table):
+        agent.n_games = 1000  # no exploration: always the greedy path
+
+    results = {'states': len(REACHABLE_CODES)}
+    for name, agent in (('forward', network), ('table', table)):
+        results[name] = {
+            'get_action_us': round(per_call(agent.get_action, repeat, states[0]) * 1e6, 2),
+            f'get_actions_{BATCH}_us': round(per_call(agent.get_actions, repeat, states) * 1e6, 2),
+        }
+    results['speedup_get_action'] = round(results['forward']['get_action_us']
+                                          / results['table']['get_action_us'], 1)
+    results['refresh_us'] = round(per_call(table.qtable.refresh, repeat // 50) * 1e6, 1)
+
+    every = UNPACK_TABLE[REACHABLE_CODES]
+    results['agreement'] = float(np.mean(
+        [network.get_action(s).index(1) == table.get_action(s).index(1) for s in every]))
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'qtable.npz')
+        table.qtable.save(path)
+        results['file_bytes'] = os.path.getsize(path)
+        policy = QTablePolicy(path)
+        results['numpy_policy_action_us'] = round(per_call(policy.action, repeat, states[0]) * 1e6, 2)
+    return {'qtable': results}
+
+if __name__ == '__main__':
+    emit(run())
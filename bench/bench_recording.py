@@ -0,0 +1,61 @@
+"""Cost of recording games during training (recording.py) and of rebuilding
+them (replay.py): recorder time per move and its share of a training step,
+bytes per move on disk, and headless replay moves/sec.
+
+Trains a few headless games with recording on in a temporary directory and
+measures on the games it wrote.
+"""
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from train import train
+from recording import EpisodeRecorder, load_recording, unpack_actions
+from replay import rebuild, verify
+from bench.common import emit
+
+def run(seed=0, quick=False):
+    games = 10 if quick else 60
+    with tempfile.TemporaryDirectory() as model_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = train(render=False, dashboard='none', model_dir=model_dir, log_metrics=False,
+                          save_checkpoints=False, persist_memory=False, max_games=games,
+                          seed=seed)
+        path = os.path.join(model_dir, 'episodes.bin')
+        file_bytes = os.path.getsize(path)
+        recording = load_recording(path)
+        moves = sum(e.steps for e in recording.episodes)
+
+        # Re-record the same games: per-move cost including end() and disk writes
+        recorder = EpisodeRecorder(os.path.join(model_dir, 'again.bin'), recording.w, recording.h)
+        streams = [(e, unpack_actions(e).tolist(), e.rewards.tolist()) for e in recording.episodes]
+        start = time.perf_counter()
+        for e, acts, rewards in streams:
+            recorder.begin(e.seed)
+            for a, r in zip(acts, rewards):
+                recorder.step(a, r)
+            recorder.end(e.game, e.score, e.record)
+        recorder.close()
+        record_s = (time.perf_counter() - start) / moves
+
+        start = time.perf_counter()
+        for e in recording.episodes:
+            for _ in rebuild(recording, e):
+                pass
+        replay_s = time.perf_counter() - start
+        exact = all(verify(recording, e) for e in recording.episodes)
+    return {'recording': {
+        'games': len(recording.episodes),
+        'moves': moves,
+        'bytes_per_move': round(file_bytes / moves, 3),
+        'record_ns_per_move': round(record_s * 1e9, 1),
+        'overhead_pct': round(100 * record_s * stats['steps_per_sec'], 3),
+        'train_steps_per_sec': round(stats['steps_per_sec'], 1),
+        'replay_moves_per_sec': round(moves / replay_s),
+        'replays_exact': exact,
+    }}
+
+if __name__ == '__main__':
+    emit(run())
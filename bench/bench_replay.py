@@ -0,0 +1,57 @@
+"""Replay memory: append cost and sampling cost at several fill levels, for
+the uniform and the prioritized buffer, each plain and bit-packed; bytes per
+stored transition, and the pickled size of an actor's chunk of transitions."""
+import pickle
+
+import numpy as np
+
+from dqn_agent import MAX_MEMORY, BATCH_SIZE
+from distributed import CHUNK_SIZE
+from features import pack_states, pack_transitions
+from replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from bench.common import per_call, emit
+
+FILL_LEVELS = (0.01, 0.1, 0.5, 1.0)
+
+def random_transitions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.integers(0, 2, (n, 11)).astype(np.float32), rng.integers(0, 3, n),
+            rng.choice([-10.0, 0.0, 10.0], n).astype(np.float32),
+            rng.integers(0, 2, (n, 11)).astype(np.float32), rng.random(n) < 0.1)
+
+def run(seed=0, quick=False):
+    capacity = MAX_MEMORY // 10 if quick else MAX_MEMORY
+    repeat = 20 if quick else 200
+    data = random_transitions(capacity, seed)
+    results = {'capacity': capacity, 'batch_size': BATCH_SIZE}
+
+    for name, cls, packed in (('uniform', ReplayBuffer, False),
+                              ('prioritized', PrioritizedReplayBuffer, False),
+                              ('uniform_packed', ReplayBuffer, True),
+                              ('prioritized_packed', PrioritizedReplayBuffer, True)):
+        memory = cls(capacity, seed=seed, packed=packed)
+        one = [d[0] for d in data]
+        per = {'append_us': round(per_call(memory.append, repeat * 10, *one) * 1e6, 3),
+               'bytes_per_transition': sum(getattr(memory, field).nbytes
+                                           for field, _, _ in memory._fields()) / capacity}
+        memory = cls(capacity, seed=seed, packed=packed)
+        filled = 0
+        for fill in FILL_LEVELS:
+            n = int(capacity * fill)
+            memory.extend(*(d[filled:n] for d in data))
+            filled = n
+            per[f'sample_us_fill_{int(fill * 100)}pct'] = round(
+                per_call(memory.sample, repeat, BATCH_SIZE) * 1e6, 2)
+        results[name] = per
+
+    # What an actor sends the learner per chunk (see distributed.py)
+    states, actions, rewards, next_states, dones = (d[:CHUNK_SIZE] for d in data)
+    plain = ('transitions', 0, states, actions, rewards, next_states, dones)
+    packed = ('transitions', 0, pack_transitions(states, actions, dones),
+              rewards.astype(np.float16), pack_states(next_states))
+    results['chunk_bytes'] = {'transitions': CHUNK_SIZE, 'plain': len(pickle.dumps(plain)),
+                              'packed': len(pickle.dumps(packed))}
+    return {'replay': results}
+
+if __name__ == '__main__':
+    emit(run())
@@ -0,0 +1,43 @@
+"""End-to-end games/sec and steps/sec of the headless train() loop, with and
+without per-phase profiling.
+
+Runs in a temporary model directory, so nothing under ./model is read or
+written; the per-game console output is discarded.
+"""
+import contextlib
+import io
+import tempfile
+
+from train import train
+from profiling import PhaseProfiler
+from bench.common import per_call, emit
+
+LAPS_PER_STEP = 7  # profiler.lap calls per step of train() (outside game ends)
+
+def run_train(seed, games, **kwargs):
+    with tempfile.TemporaryDirectory() as model_dir, contextlib.redirect_stdout(io.StringIO()):
+        return train(render=False, dashboard='none', model_dir=model_dir, log_metrics=False,
+                     save_checkpoints=False, persist_memory=False, max_games=games, seed=seed,
+                     **kwargs)
+
+def run(seed=0, quick=False):
+    games = 10 if quick else 60
+    stats = run_train(seed, games)
+    profiled = run_train(seed, games, profile_every=games)
+
+    # Profiling cost per step: the loop takes LAPS_PER_STEP laps per step
+    profiler = PhaseProfiler()
+    lap_s = per_call(profiler.lap, 100_000, 'phase')
+    return {'train_loop': {
+        'games': stats['games'],
+        'steps': stats['steps'],
+        'record': stats['record'],
+        'games_per_sec': round(stats['games_per_sec'], 2),
+        'steps_per_sec': round(stats['steps_per_sec'], 1),
+        'profiled_steps_per_sec': round(profiled['steps_per_sec'], 1),
+        'profiler_lap_ns': round(lap_s * 1e9, 1),
+        'profiler_overhead_pct': round(100 * LAPS_PER_STEP * lap_s * stats['steps_per_sec'], 3),
+    }}
+
+if __name__ == '__main__':
+    emit(run())
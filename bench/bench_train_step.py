@@ -0,0 +1,77 @@
+"""QTrainer.train_step: batched Bellman targets vs the old per-sample loop,
+and the cost of one step at batch sizes 1, 32 and BATCH_SIZE."""
+import copy
+import random
+
+import numpy as np
+import torch
+
+from dqn_agent import Linear_QNet, QTrainer, BATCH_SIZE
+from bench.common import per_call, emit
+
+def loop_train_step(trainer, state, action, reward, next_state, done):
+    """The original train_step, one forward pass per sample for the targets"""
+    state = torch.tensor(state, dtype=torch.float)
+    next_state = torch.tensor(next_state, dtype=torch.float)
+    action = torch.tensor(action, dtype=torch.long)
+    reward = torch.tensor(reward, dtype=torch.float)
+    pred = trainer.model(state)
+    target = pred.clone()
+    for idx in range(len(done)):
+        Q_new = reward[idx]
+        if not done[idx]:
+            Q_new = reward[idx] + trainer.gamma * torch.max(trainer.model(next_state[idx]))
+        target[idx][torch.argmax(action[idx]).item()] = Q_new
+    trainer.optimizer.zero_grad()
+    loss = trainer.criterion(target, pred)
+    loss.backward()
+    trainer.optimizer.step()
+
+def make_batch(batch_size, seed=0):
+    rng = np.random.default_rng(seed)
+    states = rng.integers(0, 2, (batch_size, 11)).astype(np.float32)
+    next_states = rng.integers(0, 2, (batch_size, 11)).astype(np.float32)
+    actions = np.eye(3, dtype=np.int64)[rng.integers(0, 3, batch_size)]
+    rewards = rng.choice([-10.0, 0.0, 10.0], batch_size).astype(np.float32)
+    dones = tuple(bool(d) for d in rng.random(batch_size) < 0.1)
+    return states, actions, rewards, next_states, dones
+
+def max_param_diff(a, b):
+    return max((pa - pb).abs().max().item() for pa, pb in zip(a.parameters(), b.parameters()))
+
+def run(seed=0, quick=False):
+    random.seed(seed)
+    torch.manual_seed(seed)
+    repeat = 5 if quick else 20
+    batch = make_batch(BATCH_SIZE, seed)
+
+    # The two implementations must take the same optimizer step
+    model = Linear_QNet(11, 256, 3)
+    vec = QTrainer(copy.deepcopy(model), lr=0.001, gamma=0.9)
+    ref = QTrainer(copy.deepcopy(model), lr=0.001, gamma=0.9)
+    vec.train_step(*batch)
+    loop_train_step(ref, *batch)
+    diff = max_param_diff(vec.model, ref.model)
+
+    loop_time = per_call(loop_train_step, repeat, ref, *batch)
+    vec_time = per_call(vec.train_step, repeat, *batch)
+
+    # Short-memory steps (1), a typical minibatch (32) and long-memory batches,
+    # with index actions as the replay memory stores them
+    by_size = {}
+    for batch_size in (1, 32, BATCH_SIZE):
+        states, actions, rewards, next_states, dones = make_batch(batch_size, seed)
+        args = (states, actions.argmax(axis=1), rewards, next_states, np.array(dones))
+        n = repeat * 50 if batch_size < 100 else repeat
+        by_size[f'batch_{batch_size}_ms'] = round(per_call(vec.train_step, n, *args) * 1e3, 4)
+    return {'train_step': {
+        'batch_size': BATCH_SIZE,
+        'loop_ms': round(loop_time * 1e3, 3),
+        'batched_ms': round(vec_time * 1e3, 3),
+        'speedup': round(loop_time / vec_time, 1),
+        'max_param_diff_vs_loop': diff,
+        'by_batch_size': by_size,
+    }}
+
+if __name__ == '__main__':
+    emit(run())
@@ -0,0 +1,72 @@
+"""VectorSnakeEnv.step vs SnakeGame.play_step: boards stepped per second.
+
+Also checks the env's promise that board i with seed s plays exactly like
+SnakeGame(seed=s + i): same rewards, dones, scores, states and episode
+seeds on every step, on a few board sizes. The smallest boards start with
+part of the snake off the board and get filled to a win.
+"""
+import random
+import time
+
+import numpy as np
+
+from features import game_features
+from snake_game import SnakeGame
+from vector_env import VectorSnakeEnv
+from bench.common import emit
+
+# (w, h) in pixels: the default board, a small one and two narrower than the start snake
+SIZES = ((640, 480), (120, 100), (60, 80), (40, 60))
+NUM_ENVS = 4
+
+def check_parity(steps, w, h, seed=0):
+    """Step NUM_ENVS boards both ways with the same moves; returns games won"""
+    env = VectorSnakeEnv(NUM_ENVS, w, h, seed=seed)
+    games = [SnakeGame(w, h, render=False, seed=seed + i) for i in range(NUM_ENVS)]
+    rng = random.Random(seed)
+    states = np.array([game_features(game) for game in games])
+    moves = np.eye(3, dtype=int)
+    wins = 0
+    for _ in range(steps):
+        # Random moves that avoid immediate danger when possible, so small boards fill up
+        actions = np.array([rng.choice([a for a in range(3) if not s[a]] or [0]) for s in states])
+        states, rewards, dones, scores = env.step(actions)
+        for i, game in enumerate(games):
+            reward, done, score, _ = game.play_step(moves[actions[i]])
+            if done:
+                wins += game.food is None
+                game.reset()
+            assert (reward, done) == (rewards[i], dones[i]), (w, h, i)
+            assert not done or score == scores[i], (w, h, i)
+            assert np.array_equal(game_features(game), states[i]), (w, h, i)
+            assert game.episode_seed == env.episode_seeds[i], (w, h, i)
+    return wins
+
+def run(seed=0, quick=False):
+    steps = 2000 if quick else 10000
+    wins = {f'{w}x{h}': check_parity(steps, w, h, seed) for w, h in SIZES}
+
+    repeat = 200 if quick else 2000
+    env = VectorSnakeEnv(1024, seed=seed)
+    actions = np.random.default_rng(seed).integers(0, 3, (repeat, 1024))
+    start = time.perf_counter()
+    for a in actions:
+        env.step(a)
+    vector = 1024 * repeat / (time.perf_counter() - start)
+
+    game = SnakeGame(render=False, seed=seed)
+    moves = np.eye(3, dtype=int)[actions[:, 0]]
+    start = time.perf_counter()
+    for move in moves:
+        if game.play_step(move)[1]:
+            game.reset()
+    single = repeat / (time.perf_counter() - start)
+    return {'vector_env': {
+        'parity_steps_per_size': steps * NUM_ENVS,
+        'parity_wins': wins,
+        'vector_1024_board_steps_per_sec': round(vector),
+        'snake_game_steps_per_sec': round(single),
+    }}
+
+if __name__ == '__main__':
+    emit(run())
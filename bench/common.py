@@ -0,0 +1,13 @@
+import json
+import time
+
+def per_call(fn, repeat, *args):
+    """Average seconds per call of fn(*args) over repeat calls"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat
+
+def emit(results):
+    """Print benchmark results as sorted, diffable JSON"""
+    print(json.dumps(results, indent=2, sort_keys=True))
@@ -0,0 +1,101 @@
+"""Run the whole benchmark suite and print (or save) one JSON document.
+
+    python -m bench.run                    # full suite
+    python -m bench.run --quick --out a.json
+    python -m bench.run --only replay train_step
+    python -m bench.run --compare a.json b.json
+
+Every benchmark is seeded, so counts (steps, games, records, checked states)
+are identical between runs on the same machine and only the timings move.
+Save the output for two commits and --compare them to spot regressions.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import torch
+
+from bench.common import emit
+
+# Benchmark name -> module; each module has run(seed, quick) -> dict
+BENCHMARKS = {
+    'collision': 'bench.bench_collision',  # play_step steps/sec vs snake length
+    'features': 'bench.bench_features',  # get_state latency
+    'vector_env': 'bench.bench_vector_env',  # VectorSnakeEnv steps/sec and parity with SnakeGame
+    'get_action': 'bench.bench_get_action',  # get_action / get_actions latency
+    'qtable': 'bench.bench_qtable',  # greedy actions from the Q-value table vs a forward pass
+    'train_step': 'bench.bench_train_step',  # train_step at batch sizes 1/32/1000
+    'forward': 'bench.bench_forward',  # Q-network forward per forward mode and thread count
+    'replay': 'bench.bench_replay',  # replay append / sampling vs fill level
+    'train_loop': 'bench.bench_train_loop',  # end-to-end train() games/sec
+    'dashboard': 'bench.bench_dashboard',  # games/sec with the dashboard attached
+    'import': 'bench.bench_import',  # cold import times and worker-pool start-up
+    'recording': 'bench.bench_recording',  # episode recording cost and replay speed
+    'convergence': 'bench.bench_convergence',  # games/seconds to a mean score, per target mode
+}
+# Too slow for every run; include with --only
+OPT_IN = {'convergence'}
+
+def run_suite(names=None, seed=0, quick=False):
+    results = {'meta': {
+        'seed': seed,
+        'quick': quick,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'torch_threads': torch.get_num_threads(),
+    }}
+    for name in names or BENCHMARKS:
+        start = time.perf_counter()
+        results.update(importlib.import_module(BENCHMARKS[name]).run(seed=seed, quick=quick))
+        print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return results
+
+def _flatten(d, prefix=''):
+    for key, value in d.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}', value
+
+def compare(old, new):
+    """Print every numeric result of two suite outputs with its ratio new/old"""
+    old, new = dict(_flatten(old)), dict(_flatten(new))
+    for key in sorted(old.keys() | new.keys()):
+        a, b = old.get(key), new.get(key)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+            ratio = f'{b / a:8.3f}x' if a else ''
+            print(f'{key:60s} {a:>14} {b:>14} {ratio}')
+        elif a != b:
+            print(f'{key:60s} {str(a):>14} {str(b):>14}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--quick', action='store_true', help='fewer repetitions (smoke test)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), metavar='NAME',
+                        help=f'run only these benchmarks ({", ".join(BENCHMARKS)})')
+    parser.add_argument('--skip', nargs='+', choices=list(BENCHMARKS), default=[], metavar='NAME',
+                        help='skip these benchmarks')
+    parser.add_argument('--out', metavar='FILE', help='also write the JSON to FILE')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two saved outputs instead of running')
+    args = parser.parse_args()
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            compare(json.load(f_old), json.load(f_new))
+    else:
+        names = [n for n in (args.only or BENCHMARKS)
+                 if n not in args.skip and (args.only or n not in OPT_IN)]
+        results = run_suite(names, seed=args.seed, quick=args.quick)
+        emit(results)
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
@@ -0,0 +1,109 @@
+"""Crash-safe, asynchronous checkpoints of the full training state.
+
+A checkpoint holds the Agent (games played, weights, optimizer, replay
+memory), the Python/NumPy/PyTorch RNG states and any extra values the
+training loop passes in (record, total score, the game's RNG). The snapshot
+is copied on the training thread, which is cheap, and written to disk in a
+background thread as a temp file that is then renamed. A crash therefore
+leaves either the previous checkpoint or the new one, never a torn file.
+Only the newest `keep` checkpoints are kept.
+
+    python train.py --resume
+"""
+import glob
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import torch
+
+# Constants
+CHECKPOINT_DIR = './model/checkpoints'
+CHECKPOINT_EVERY_SECONDS = 300
+KEEP_CHECKPOINTS = 3
+
+def rng_state():
+    """States of the global Python, NumPy and PyTorch RNGs"""
+    return {'python': random.getstate(), 'numpy': np.random.get_state(),
+            'torch': torch.get_rng_state()}
+
+def set_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+
+class CheckpointManager:
+    """Saves agent checkpoints every `every_games` games and/or every
+    `every_seconds` seconds (whichever comes first; None disables either)"""
+    def __init__(self, folder=CHECKPOINT_DIR, every_games=None,
+                 every_seconds=CHECKPOINT_EVERY_SECONDS, keep=KEEP_CHECKPOINTS):
+        self.folder = folder
+        self.every_games = every_games
+        self.every_seconds = every_seconds
+        self.keep = keep
+        self._last_games = 0
+        self._last_time = time.time()
+        self._writer = None
+
+    def maybe_save(self, agent, **extra):
+        """Checkpoint if the cadence says so; call once per finished game"""
+        due = ((self.every_games and agent.n_games - self._last_games >= self.every_games) or
+               (self.every_seconds and time.time() - self._last_time >= self.every_seconds))
+        if due and not self.busy():
+            self.save(agent, **extra)
+
+    def busy(self):
+        """True while the previous checkpoint is still being written"""
+        return self._writer is not None and self._writer.is_alive()
+
+    def save(self, agent, **extra):
+        """Snapshot now and write it in the background"""
+        self.wait()  # one write at a time
+        snapshot = {'agent': agent.state_dict(), 'rng': rng_state(),
+                    'extra': extra, 'time': time.time()}
+        path = os.path.join(self.folder, f'checkpoint_{agent.n_games:09d}.pt')
+        self._last_games = agent.n_games
+        self._last_time = time.time()
+        self._writer = threading.Thread(target=self._write, args=(snapshot, path))
+        self._writer.start()
+
+    def wait(self):
+        """Block until the checkpoint being written (if any) is on disk"""
+        if self._writer is not None:
+            self._writer.join()
+
+    def _write(self, snapshot, path):
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            torch.save(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        for old in self.checkpoints()[:-self.keep]:
+            os.remove(old)
+
+    def checkpoints(self):
+        """Paths of the complete checkpoints, oldest first"""
+        return sorted(glob.glob(os.path.join(self.folder, 'checkpoint_*.pt')))
+
+    def latest(self):
+        checkpoints = self.checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def restore(self, agent, path=None):
+        """Load the latest (or the given) checkpoint into agent and the global
+        RNGs; returns its extra values, or None if there is no checkpoint"""
+        path = path or self.latest()
+        if path is None:
+            return None
+        # Checkpoints hold NumPy arrays and RNG states, not just tensors;
+        # only load files this manager wrote
+        snapshot = torch.load(path, weights_only=False)
+        agent.load_state_dict(snapshot['agent'])
+        set_rng_state(snapshot['rng'])
+        self._last_games = agent.n_games
+        self._last_time = time.time()
+        return snapshot['extra']
@@ -0,0 +1,34 @@
+"""Types shared by the game, the features and the agent, plus the process
+context for headless workers. Standard library only, so importing it is
+instant and never touches pygame, matplotlib or torch."""
+import multiprocessing
+from collections import namedtuple
+from enum import Enum
+
+# Direction enum
+class Direction(Enum):
+    RIGHT = 1
+    LEFT = 2
+    UP = 3
+    DOWN = 4
+
+Point = namedtuple('Point', 'x, y')
+
+# Game settings
+BLOCK_SIZE = 20
+
+def worker_context(preload=()):
+    """multiprocessing context for starting headless worker processes.
+
+    Uses forkserver where the platform has it: the server imports the
+    preload modules (e.g. 'train', which brings in torch) once, and each
+    worker is forked from it with them already loaded, so starting a worker
+    costs milliseconds instead of a fresh interpreter's imports. Falls back
+    to spawn elsewhere. Call before any forkserver worker has started, or
+    the preload list is ignored.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(list(preload))
+        return ctx
+    return multiprocessing.get_context('spawn')
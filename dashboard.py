@@ -0,0 +1,190 @@
+"""Training dashboard in its own process, fed over a local socket.
+
+The training loop owns a DashboardServer and calls update() once per game,
+which is a single append to a bounded deque (the oldest stats are dropped if
+nothing drains it). A background thread forwards the stats to every attached
+viewer, so GUI work never runs on the training thread. Viewers can attach to
+and detach from a running session at any time; a newly attached viewer first
+receives the last HISTORY games.
+
+Each session has its own random authkey, printed with the port, and stats
+travel as JSON, so a viewer never unpickles what a socket hands it.
+
+    python train.py                       # spawns a viewer automatically
+    python train.py --dashboard serve     # no viewer; attach one later with
+    python dashboard.py --port P --authkey KEY  # ...this, from another terminal
+"""
+import argparse
+import json
+import secrets
+import threading
+import time
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+# Constants
+DASHBOARD_HOST = 'localhost'
+DASHBOARD_PORT = 6060
+QUEUE_SIZE = 1000  # games buffered between the trainer and the sender thread
+HISTORY = 100  # games replayed to a newly attached viewer (the dashboard shows 100)
+SEND_INTERVAL = 0.05  # seconds the sender thread sleeps when there is nothing to send
+
+class DashboardServer:
+    """Training-side end of the dashboard.
+
+    Has the same update(...)/close() interface as TrainingVisualizer, so the
+    training loop does not care which one it talks to.
+    """
+    def __init__(self, host=DASHBOARD_HOST, port=DASHBOARD_PORT, authkey=None,
+                 queue_size=QUEUE_SIZE):
+        if authkey is None:
+            authkey = secrets.token_hex(16).encode()  # a fresh key per session
+        try:
+            self.listener = Listener((host, port), authkey=authkey)
+        except OSError:
+            self.listener = Listener((host, 0), authkey=authkey)  # port taken: any free one
+        self.address = self.listener.address
+        self.authkey = authkey
+        self.queue = deque(maxlen=queue_size)  # drop-oldest hand-off from the trainer
+        self.history = deque(maxlen=HISTORY)
+        self.viewer = None
+        self._new_conns = []
+        self._conns = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+
+    def update(self, game_num, score, mean_score, record, epsilon, memory_size):
+        """Queue one game's stats; never blocks"""
+        self.queue.append((game_num, score, mean_score, record, epsilon, memory_size))
+
+    def spawn_viewer(self, max_fps=2.0):
+        """Start a viewer process attached to this server"""
+        import multiprocessing as mp
+        ctx = mp.get_context('spawn')
+        self.viewer = ctx.Process(target=run_dashboard, daemon=True,
+                                  args=(self.address, self.authkey, max_fps, False))
+        self.viewer.start()
+
+    def close(self):
+        """Send what is queued, disconnect the viewers and stop the server"""
+        self._stop.set()
+        self._sender.join(timeout=2)
+        with self._lock:
+            conns = self._conns + self._new_conns
+            self._conns, self._new_conns = [], []
+        for conn in conns:
+            conn.close()
+        self.listener.close()
+        if self.viewer is not None:
+            self.viewer.join(timeout=2)
+            if self.viewer.is_alive():
+                self.viewer.terminate()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, AuthenticationError):
+                if self._stop.is_set():
+                    return
+                continue  # failed handshake (wrong authkey etc.)
+            with self._lock:
+                self._new_conns.append(conn)
+
+    def _send_loop(self):
+        while True:
+            stopping = self._stop.is_set()
+            batch = []
+            while self.queue:
+                batch.append(self.queue.popleft())
+            self.history.extend(batch)
+
+            if batch:
+                for conn in list(self._conns):
+                    if not self._send(conn, batch):
+                        with self._lock:
+                            self._conns.remove(conn)
+
+            with self._lock:
+                new_conns, self._new_conns = self._new_conns, []
+            for conn in new_conns:
+                # Catch up on recent games (the history already includes this batch)
+                if self._send(conn, list(self.history)):
+                    with self._lock:
+                        self._conns.append(conn)
+
+            if stopping:
+                return
+            time.sleep(SEND_INTERVAL)
+
+    @staticmethod
+    def _send(conn, batch):
+        # False once the viewer has gone away (window closed = detached)
+        try:
+            if batch:
+                conn.send_bytes(json.dumps(batch).encode())
+            return True
+        except OSError:
+            conn.close()
+            return False
+
+def run_dashboard(address, authkey, max_fps=2.0, keep_open=True):
+    """Viewer: show the TrainingVisualizer for a running training session.
+
+    authkey is the session's key (DashboardServer.authkey, printed by train.py).
+
+    Returns when the window is closed, or when training ends unless keep_open.
+    """
+    from visualizer import TrainingVisualizer
+
+    # The trainer may still be starting up
+    deadline = time.time() + 10
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                print(f"No training session at {address[0]}:{address[1]}")
+                return
+            time.sleep(0.2)
+        except AuthenticationError:
+            print(f"Wrong authkey for the training session at {address[0]}:{address[1]}")
+            return
+
+    visualizer = TrainingVisualizer(max_fps=max_fps)
+    import matplotlib.pyplot as plt  # loaded, with its backend, by the visualizer
+    try:
+        while plt.fignum_exists(visualizer.fig.number):
+            try:
+                while conn is not None and conn.poll():
+                    for stats in json.loads(conn.recv_bytes()):
+                        visualizer.update(*stats)
+            except (EOFError, OSError):
+                conn = None
+                print("Training session ended")
+                if not keep_open:
+                    break
+            visualizer.flush()
+            plt.pause(SEND_INTERVAL)  # keeps the window responsive
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if conn is not None:
+            conn.close()
+        visualizer.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Attach a dashboard to a running training session')
+    parser.add_argument('--host', default=DASHBOARD_HOST)
+    parser.add_argument('--port', type=int, default=DASHBOARD_PORT)
+    parser.add_argument('--authkey', required=True,
+                        help="the session's key, printed by train.py at startup")
+    parser.add_argument('--max-fps', type=float, default=2.0,
+                        help='maximum dashboard redraws per second (default: 2)')
+    args = parser.parse_args()
+    run_dashboard((args.host, args.port), args.authkey.encode(), max_fps=args.max_fps)
@@ -0,0 +1,221 @@
+"""Distributed training: actor processes play, one learner process trains.
+
+Each actor runs a headless SnakeGame with its own CPU copy of Linear_QNet and
+streams transitions to the learner in chunks over a bounded queue, bit-packed
+to 6 bytes each (see features.pack_transitions). The
+learner owns the replay memory and QTrainer and publishes its weights to a
+shared-memory model every sync_every gradient steps; actors pick them up
+before sending their next chunk.
+
+    python train.py --actors 4
+"""
+import queue
+import random
+import time
+import traceback
+
+import numpy as np
+import torch
+import torch.multiprocessing  # registers pickling of shared-memory tensors for the actors
+
+from core import worker_context
+from dqn_agent import (Agent, Linear_QNet, FORWARD_MODE, MAX_MEMORY, LR, GAMMA, HIDDEN_SIZE,
+                       EPSILON_START, EPSILON_DECAY, TARGET_UPDATE, TAU)
+from features import pack_states, pack_transitions
+from snake_game import SnakeGame
+
+# Constants
+CHUNK_SIZE = 64  # transitions per message from an actor
+SYNC_EVERY = 50  # learner gradient steps between weight broadcasts
+LEARNER_BATCH_SIZE = 256
+
+def _put(q, msg, stop_event):
+    # Blocking put that still notices shutdown when the learner stops reading
+    while not stop_event.is_set():
+        try:
+            q.put(msg, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+def _actor(actor_id, seed, q, shared_model, version, lock, n_games, stop_event, chunk_size,
+           agent_kwargs):
+    torch.set_num_threads(1)  # one core per actor
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+    try:
+        agent = Agent(max_memory=1, **agent_kwargs)  # acting only; the learner owns the memory
+        game = SnakeGame(render=False, seed=seed)
+        local_version = -1
+
+        states = np.zeros((chunk_size, 11), dtype=np.float32)
+        next_states = np.zeros((chunk_size, 11), dtype=np.float32)
+        actions = np.zeros(chunk_size, dtype=np.int64)
+        rewards = np.zeros(chunk_size, dtype=np.float32)
+        dones = np.zeros(chunk_size, dtype=bool)
+        n = 0
+
+        while not stop_event.is_set():
+            if n == 0 and version.value != local_version:
+                with lock:
+                    agent.model.load_state_dict(shared_model.state_dict())
+                    local_version = version.value
+
+            # Epsilon follows the number of games played by all actors
+            agent.n_games = n_games.value
+            state_old = agent.get_state(game)
+            final_move = agent.get_action(state_old)
+            reward, done, score, _ = game.play_step(final_move)
+            state_new = agent.get_state(game)
+
+            states[n] = state_old
+            actions[n] = np.argmax(final_move)
+            rewards[n] = reward
+            next_states[n] = state_new
+            dones[n] = done
+            n += 1
+
+            if done:
+                game.reset()
+                with n_games.get_lock():
+                    n_games.value += 1
+                _put(q, ('episode', actor_id, score), stop_event)
+
+            if n == chunk_size:
+                _put(q, ('transitions', actor_id, pack_transitions(states, actions, dones),
+                         rewards.astype(np.float16), pack_states(next_states)), stop_event)
+                n = 0
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        traceback.print_exc()
+        stop_event.set()
+
+def train_distributed(num_actors=4, sync_every=SYNC_EVERY, batch_size=LEARNER_BATCH_SIZE,
+                      chunk_size=CHUNK_SIZE, prioritized=False, max_games=None, seed=0,
+                      num_threads=None, forward_mode=FORWARD_MODE, packed_memory=False,
+                      model_dir='./model', max_seconds=None, gamma=GAMMA, lr=LR,
+                      hidden_size=HIDDEN_SIZE, max_memory=MAX_MEMORY,
+                      epsilon_start=EPSILON_START, epsilon_decay=EPSILON_DECAY,
+                      target_update=TARGET_UPDATE, tau=TAU, double=False):
+    """Run the learner in this process with num_actors actor processes.
+
+    Actors always use one thread each; num_threads pins the learner's.
+    packed_memory bit-packs the learner's replay memory (see ReplayBuffer).
+    The best model is saved to model_dir. Actor i is seeded with seed + i
+    (seed=None: unseeded). gamma, lr, hidden_size, max_memory,
+    epsilon_start, epsilon_decay, target_update, tau and double configure
+    the agents as in train(); stops after max_games games or max_seconds.
+    """
+    ctx = worker_context(preload=['distributed'])  # actors start with torch loaded
+    if seed is not None:
+        torch.manual_seed(seed)
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    # Shared by the learner and the actors, which only act
+    agent_kwargs = dict(forward_mode=forward_mode, hidden_size=hidden_size,
+                        epsilon_start=epsilon_start, epsilon_decay=epsilon_decay)
+    agent = Agent(prioritized=prioritized, packed_memory=packed_memory, max_memory=max_memory,
+                  gamma=gamma, lr=lr, target_update=target_update, tau=tau, double=double,
+                  **agent_kwargs)
+    if agent.model.load(model_folder_path=model_dir):
+        print("Loaded existing model")
+
+    # Weights the actors copy from; lives in shared memory
+    shared_model = Linear_QNet(11, hidden_size, 3)
+    shared_model.load_state_dict(agent.model.state_dict())
+    shared_model.share_memory()
+    version = ctx.Value('l', 0, lock=False)
+    lock = ctx.Lock()
+    n_games = ctx.Value('l', 0)
+    stop_event = ctx.Event()
+    q = ctx.Queue(maxsize=8 * num_actors)
+
+    actors = [ctx.Process(target=_actor, daemon=True,
+                          args=(i, None if seed is None else seed + i, q, shared_model,
+                                version, lock, n_games, stop_event, chunk_size, agent_kwargs))
+              for i in range(num_actors)]
+    for p in actors:
+        p.start()
+
+    print("=" * 60)
+    print(f"Distributed Snake RL Training: {num_actors} actors, 1 learner")
+    print("Press Ctrl+C to stop")
+    print("=" * 60)
+
+    games = 0
+    record = 0
+    total_score = 0
+    updates = 0
+    steps = 0
+    start = time.time()
+    try:
+        while not stop_event.is_set() and (max_games is None or games < max_games):
+            if max_seconds is not None and time.time() - start >= max_seconds:
+                break
+            # Ingest whatever the actors have sent; wait only if there is nothing to train on
+            try:
+                msg = q.get(timeout=0.1) if len(agent.memory) < batch_size else q.get_nowait()
+            except queue.Empty:
+                msg = None
+            while msg is not None:
+                if msg[0] == 'transitions':
+                    agent.memory.extend_packed(*msg[2:])
+                    steps += len(msg[2])
+                else:
+                    score = msg[2]
+                    games += 1
+                    total_score += score
+                    if score > record:
+                        record = score
+                        agent.model.save(model_folder_path=model_dir)
+                        print(f'🎉 NEW RECORD! Score: {score} - Model saved!')
+                    elapsed = time.time() - start
+                    print(f'Game {games:5d} | Actor {msg[1]:2d} | Score: {score:3d} | '
+                          f'Mean: {total_score / games:5.2f} | Record: {record:3d} | '
+                          f'Steps/s: {steps / elapsed:8.0f} | Updates: {updates:6d}')
+                    if max_games is not None and games >= max_games:
+                        break  # later episodes in the queue are past the budget
+                try:
+                    msg = q.get_nowait()
+                except queue.Empty:
+                    msg = None
+            if max_games is not None and games >= max_games:
+                break
+
+            if len(agent.memory) >= batch_size:
+                agent.train_batch(batch_size)
+                updates += 1
+                if updates % sync_every == 0:
+                    with lock:
+                        shared_model.load_state_dict(agent.model.state_dict())
+                        version.value += 1
+    except KeyboardInterrupt:
+        print("\n" + "=" * 60)
+        print("Training stopped by user (Ctrl+C)")
+        print("=" * 60)
+    finally:
+        stop_event.set()
+        # Drain so actors blocked on a full queue can exit
+        deadline = time.time() + 5
+        while any(p.is_alive() for p in actors) and time.time() < deadline:
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for p in actors:
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+        elapsed = time.time() - start
+        print(f"Final Statistics:")
+        print(f"  Total Games: {games}")
+        print(f"  Record Score: {record}")
+        print(f"  Mean Score: {total_score / max(1, games):.2f}")
+        print(f"  Environment Steps/s: {steps / max(elapsed, 1e-9):.0f}")
+        print(f"  Gradient Updates: {updates}")
+        print("=" * 60)
+    return {'games': games, 'record': record, 'mean_score': total_score / max(1, games),
+            'steps': steps, 'updates': updates, 'seconds': time.time() - start}
@@ -3,10 +3,39 @@ import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
 import numpy as np
-from collections import deque
 import random
+import copy
 import os
-from snake_game import Direction, Point
+from features import game_features, pack_states
+from qtable import QTableCache, QTABLE_EVERY
+from replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+
+# Constants
+MAX_MEMORY = 100_000
+BATCH_SIZE = 1000
+LR = 0.001
+GAMMA = 0.9  # discount rate
+HIDDEN_SIZE = 256
+# Exploration: a random move with probability epsilon / 200, where epsilon
+# starts at EPSILON_START and drops by EPSILON_DECAY per game
+EPSILON_START = 80
+EPSILON_DECAY = 1.0
+# Update schedule: every TRAIN_EVERY moves, take UPDATES_PER_STEP * TRAIN_EVERY
+# gradient steps on TRAIN_BATCH_SIZE transitions from replay memory
+# (train_every=0 keeps the per-move single-sample + per-game batch schedule)
+TRAIN_EVERY = 4
+UPDATES_PER_STEP = 0.25
+TRAIN_BATCH_SIZE = 64
+# Bootstrap targets: TARGET_UPDATE > 0 copies the model into a frozen target
+# network every TARGET_UPDATE gradient steps; TAU > 0 instead blends it in by
+# TAU after every step (Polyak). Both 0: bootstrap from the model itself.
+TARGET_UPDATE = 0
+TAU = 0.0
+# How Linear_QNet's forward pass is run for acting and training (see compile_forward)
+FORWARD_MODES = ('eager', 'fused', 'script', 'compile')
+FORWARD_MODE = 'fused'
+PER_ALPHA = 0.6  # prioritization strength (0 = uniform)
+PER_BETA = 0.4  # initial importance-sampling correction, annealed to 1
 
 class Linear_QNet(nn.Module):
     def __init__(self, input_size, hidden_size, output_size):
@@ -21,35 +50,91 @@ class Linear_QNet(nn.Module):
         x = self.linear3(x)
         return x
     
-    def save(self, file_name='model.pth'):
-        model_folder_path = './model'
+    def save(self, file_name='model.pth', model_folder_path='./model'):
         if not os.path.exists(model_folder_path):
             os.makedirs(model_folder_path)
         
         file_name = os.path.join(model_folder_path, file_name)
-        torch.save(self.state_dict(), file_name)
+        # Write a temp file and rename it, so a crash never leaves a half-written model
+        tmp_name = file_name + '.tmp'
+        torch.save(self.state_dict(), tmp_name)
+        os.replace(tmp_name, file_name)
     
-    def load(self, file_name='model.pth'):
-        model_folder_path = './model'
+    def load(self, file_name='model.pth', model_folder_path='./model'):
         file_name = os.path.join(model_folder_path, file_name)
         if os.path.exists(file_name):
-            self.load_state_dict(torch.load(file_name))
+            weights = torch.load(file_name)
+            shapes = {k: tuple(v.shape) for k, v in weights.items()}
+            if shapes != {k: tuple(v.shape) for k, v in self.state_dict().items()}:
+                # e.g. saved with another --hidden-size: start fresh instead of crashing
+                print(f"Not loading {file_name}: its layer sizes do not match this model")
+                return False
+            self.load_state_dict(weights)
             return True
         return False
 
+def compile_forward(model, mode=FORWARD_MODE):
+    """A callable computing model(x), run one of FORWARD_MODES ways.
+
+    'eager' is the module itself; 'fused' calls F.linear/F.relu directly on
+    the module's parameters, skipping nn.Module dispatch (identical results,
+    less per-call overhead); 'script' is TorchScript and 'compile' is
+    torch.compile. All of them share the module's parameters, so optimizer
+    steps and load_state_dict are seen immediately.
+    """
+    if mode == 'eager':
+        return model
+    if mode == 'fused':
+        w1, b1 = model.linear1.weight, model.linear1.bias
+        w2, b2 = model.linear2.weight, model.linear2.bias
+        w3, b3 = model.linear3.weight, model.linear3.bias
+        def forward(x):
+            return F.linear(F.relu(F.linear(F.relu(F.linear(x, w1, b1)), w2, b2)), w3, b3)
+        return forward
+    if mode == 'script':
+        return torch.jit.script(model)
+    if mode == 'compile':
+        return torch.compile(model)
+    raise ValueError(f"unknown forward mode {mode!r}, expected one of {FORWARD_MODES}")
+
 class QTrainer:
-    def __init__(self, model, lr, gamma):
+    """Q-learning updates for model.
+
+    With target_update or tau, bootstrap values come from a frozen copy of
+    the model (a target network) that is refreshed every target_update
+    gradient steps (hard) or moved towards the model by tau after every step
+    (Polyak). double=True selects the next action with the model and
+    evaluates it with the target network (Double DQN). forward, if given,
+    computes model(x) (see compile_forward).
+    """
+    def __init__(self, model, lr, gamma, target_update=0, tau=0.0, double=False, forward=None):
         self.lr = lr
         self.gamma = gamma
         self.model = model
+        self.forward = model if forward is None else forward
         self.optimizer = optim.Adam(model.parameters(), lr=self.lr)
         self.criterion = nn.MSELoss()
+        self.updates = 0  # gradient steps taken
+        self.samples = 0  # transitions trained on
+        if double and not (target_update or tau):
+            raise ValueError("double=True needs a target network (target_update or tau)")
+        self.target_update = target_update
+        self.tau = tau
+        self.double = double
+        self.target_model = None
+        if target_update or tau:
+            self.target_model = copy.deepcopy(model)
+            self.target_model.requires_grad_(False)
         
-    def train_step(self, state, action, reward, next_state, done):
-        state = torch.tensor(state, dtype=torch.float)
-        next_state = torch.tensor(next_state, dtype=torch.float)
-        action = torch.tensor(action, dtype=torch.long)
-        reward = torch.tensor(reward, dtype=torch.float)
+    def train_step(self, state, action, reward, next_state, done, weights=None):
+        """One gradient step; returns the TD errors (target - prediction at the
+        taken action). weights are optional per-sample importance-sampling weights."""
+        # as_tensor does not copy tensors or float32 arrays (e.g. ReplayBuffer batches)
+        state = torch.as_tensor(state, dtype=torch.float)
+        next_state = torch.as_tensor(next_state, dtype=torch.float)
+        action = torch.as_tensor(action, dtype=torch.long)
+        reward = torch.as_tensor(reward, dtype=torch.float)
+        done = torch.as_tensor(done, dtype=torch.bool)
         
         if len(state.shape) == 1:
             # (1, x)
@@ -57,115 +142,220 @@ class QTrainer:
             next_state = torch.unsqueeze(next_state, 0)
             action = torch.unsqueeze(action, 0)
             reward = torch.unsqueeze(reward, 0)
-            done = (done, )
+            done = torch.unsqueeze(done, 0)
         
-        # 1: predicted Q values with current state
-        pred = self.model(state)
+        # Actions may be one-hot rows or action indices
+        if action.dim() == state.dim():
+            action = torch.argmax(action, dim=1)
         
-        target = pred.clone()
-        for idx in range(len(done)):
-            Q_new = reward[idx]
-            if not done[idx]:
-                Q_new = reward[idx] + self.gamma * torch.max(self.model(next_state[idx]))
-            
-            target[idx][torch.argmax(action[idx]).item()] = Q_new
+        # 1: predicted Q values with current state
+        pred = self.forward(state)
         
         # 2: Q_new = r + y * max(next_predicted Q value) -> only do this if not done
-        # pred.clone()
-        # preds[argmax(action)] = Q_new
+        # One batched forward over all next states, masked by done. Like the
+        # per-sample loop it replaces, the bootstrap term is not detached
+        # when there is no target network.
+        if self.target_model is None:
+            next_q = self.forward(next_state).max(dim=1)[0]
+        else:
+            with torch.no_grad():
+                next_target = self.target_model(next_state)
+                if self.double:
+                    next_action = self.forward(next_state).argmax(dim=1, keepdim=True)
+                    next_q = next_target.gather(1, next_action).squeeze(1)
+                else:
+                    next_q = next_target.max(dim=1)[0]
+        Q_new = torch.where(done, reward, reward + self.gamma * next_q)
+        
+        # 3: target = pred with Q_new written at the taken action's index
+        target = pred.clone().scatter(1, action.unsqueeze(1), Q_new.unsqueeze(1))
+        
         self.optimizer.zero_grad()
-        loss = self.criterion(target, pred)
+        if weights is None:
+            loss = self.criterion(target, pred)
+        else:
+            # Importance-weighted MSE; equals criterion when all weights are 1
+            weights = torch.as_tensor(weights, dtype=torch.float)
+            loss = (weights.unsqueeze(1) * (target - pred) ** 2).mean()
         loss.backward()
         
         self.optimizer.step()
+        self.updates += 1
+        self.samples += len(state)
+        if self.target_model is not None:
+            self._update_target()
+        
+        return (Q_new - pred.gather(1, action.unsqueeze(1)).squeeze(1)).detach()
+    
+    def _update_target(self):
+        if self.tau:
+            with torch.no_grad():
+                for target, param in zip(self.target_model.parameters(), self.model.parameters()):
+                    target.lerp_(param, self.tau)
+        elif self.updates % self.target_update == 0:
+            self.target_model.load_state_dict(self.model.state_dict())
+    
+    def state_dict(self):
+        # Deep copy: training keeps updating the live optimizer state
+        state = {'optimizer': copy.deepcopy(self.optimizer.state_dict())}
+        if self.target_model is not None:
+            state['target_model'] = copy.deepcopy(self.target_model.state_dict())
+        return state
+    
+    def load_state_dict(self, state):
+        self.optimizer.load_state_dict(state['optimizer'])
+        if self.target_model is not None:
+            # A checkpoint without a target network starts it from the model
+            self.target_model.load_state_dict(state.get('target_model', self.model.state_dict()))
 
 class Agent:
-    def __init__(self):
+    def __init__(self, prioritized=False, max_memory=MAX_MEMORY, memory_path=None, seed=None,
+                 train_every=TRAIN_EVERY, updates_per_step=UPDATES_PER_STEP,
+                 batch_size=TRAIN_BATCH_SIZE, target_update=TARGET_UPDATE, tau=TAU,
+                 double=False, forward_mode=FORWARD_MODE, gamma=GAMMA, lr=LR,
+                 hidden_size=HIDDEN_SIZE, epsilon_start=EPSILON_START,
+                 epsilon_decay=EPSILON_DECAY, long_batch_size=BATCH_SIZE, packed_memory=False,
+                 qtable_every=QTABLE_EVERY):
         self.n_games = 0
+        self.steps = 0  # moves remembered
+        self.train_every = train_every
+        self.updates_per_step = updates_per_step
+        self.batch_size = batch_size
+        self.long_batch_size = long_batch_size
         self.epsilon = 0  # randomness
-        self.gamma = 0.9  # discount rate
-        self.memory = deque(maxlen=100_000)  # popleft()
-        self.model = Linear_QNet(11, 256, 3)
-        self.trainer = QTrainer(self.model, lr=0.001, gamma=self.gamma)
+        self.epsilon_start = epsilon_start
+        self.epsilon_decay = epsilon_decay
+        self.gamma = gamma
+        self.prioritized = prioritized
+        # memory_path: keep the replay memory in memory-mapped files there;
+        # seed: seed for sampling batches from it; packed_memory: 6 bytes
+        # per transition instead of 101 (see ReplayBuffer)
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(max_memory, alpha=PER_ALPHA, beta=PER_BETA,
+                                                  seed=seed, path=memory_path, packed=packed_memory)
+        else:
+            # overwrites the oldest when full
+            self.memory = ReplayBuffer(max_memory, seed=seed, path=memory_path, packed=packed_memory)
+        self.model = Linear_QNet(11, hidden_size, 3)
+        self.forward = compile_forward(self.model, forward_mode)  # used for acting and training
+        self.trainer = QTrainer(self.model, lr=lr, gamma=self.gamma,
+                                target_update=target_update, tau=tau, double=double,
+                                forward=self.forward)
+        # qtable_every > 0: greedy actions come from a table of the Q-values of
+        # every state, rebuilt after that many optimizer steps (see qtable.py)
+        self.qtable = QTableCache(self.forward, qtable_every) if qtable_every else None
+        self.profiler = None  # optional PhaseProfiler; times replay sampling
         # TODO: model, trainer
         
+    def state_dict(self):
+        """Snapshot of everything training needs to continue: games played
+        (which sets the epsilon schedule), weights, optimizer and replay memory"""
+        return {'n_games': self.n_games,
+                'steps': self.steps,
+                'epsilon': self.epsilon,
+                'prioritized': self.prioritized,
+                'model': {k: v.clone() for k, v in self.model.state_dict().items()},
+                'trainer': self.trainer.state_dict(),
+                'memory': self.memory.state_dict()}
+    
+    def load_state_dict(self, state):
+        self.n_games = state['n_games']
+        self.steps = state.get('steps', 0)
+        self.epsilon = state['epsilon']
+        self.model.load_state_dict(state['model'])
+        self.trainer.load_state_dict(state['trainer'])
+        if self.qtable is not None:
+            self.qtable.built_at = None  # new weights: rebuild on the next lookup
+        self.memory.load_state_dict(state['memory'])
+    
     def get_state(self, game):
-        head = game.snake[0]
-        point_l = Point(head.x - 20, head.y)
-        point_r = Point(head.x + 20, head.y)
-        point_u = Point(head.x, head.y - 20)
-        point_d = Point(head.x, head.y + 20)
-        
-        dir_l = game.direction == Direction.LEFT
-        dir_r = game.direction == Direction.RIGHT
-        dir_u = game.direction == Direction.UP
-        dir_d = game.direction == Direction.DOWN
-        
-        state = [
-            # Danger straight
-            (dir_r and game.is_collision(point_r)) or
-            (dir_l and game.is_collision(point_l)) or
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)),
-            
-            # Danger right
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)) or
-            (dir_l and game.is_collision(point_u)) or
-            (dir_r and game.is_collision(point_d)),
-            
-            # Danger left
-            (dir_d and game.is_collision(point_r)) or
-            (dir_u and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_u)) or
-            (dir_l and game.is_collision(point_d)),
-            
-            # Move direction
-            dir_l,
-            dir_r,
-            dir_u,
-            dir_d,
-            
-            # Food location
-            game.food.x < game.head.x,  # food left
-            game.food.x > game.head.x,  # food right
-            game.food.y < game.head.y,  # food up
-            game.food.y > game.head.y  # food down
-        ]
-        
-        return np.array(state, dtype=int)
+        # 11 features: danger straight/right/left, move direction, food direction
+        return game_features(game)
     
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))  # popleft if MAX_MEMORY is reached
+        # Stored as an action index rather than the one-hot move
+        self.memory.append(state, np.argmax(action), reward, next_state, done)
+        self.steps += 1
+    
+    def train_on_schedule(self):
+        """Mini-batch updates due after the latest move (call after remember).
+        
+        Keeps a fixed ratio of updates_per_step gradient steps of batch_size
+        samples per move, so the cost per move does not depend on how long
+        games are. Does nothing with train_every=0.
+        """
+        if (not self.train_every or self.steps % self.train_every
+                or len(self.memory) < self.batch_size):
+            return
+        # Carry fractional ratios over: e.g. 0.3 updates per step, every step
+        due = int(self.steps * self.updates_per_step) - int((self.steps - self.train_every) * self.updates_per_step)
+        for _ in range(due):
+            self.train_batch(self.batch_size)
     
     def train_long_memory(self):
-        if len(self.memory) > BATCH_SIZE:
-            mini_sample = random.sample(self.memory, BATCH_SIZE)  # list of tuples
+        self.train_batch(self.long_batch_size)
+    
+    def train_batch(self, batch_size):
+        """One gradient step on a batch sampled from replay memory"""
+        if self.prioritized:
+            states, actions, rewards, next_states, dones, weights, idx = self.memory.sample(batch_size)
+            if self.profiler is not None:
+                self.profiler.lap('replay_sample')
+            td_errors = self.trainer.train_step(states, actions, rewards, next_states, dones, weights)
+            if self.profiler is not None:
+                self.profiler.lap('train_step')
+            self.memory.update_priorities(idx, td_errors.numpy())
+            if self.profiler is not None:
+                self.profiler.lap('update_priorities')
         else:
-            mini_sample = self.memory
-        
-        states, actions, rewards, next_states, dones = zip(*mini_sample)
-        self.trainer.train_step(states, actions, rewards, next_states, dones)
+            states, actions, rewards, next_states, dones = self.memory.sample(batch_size)
+            if self.profiler is not None:
+                self.profiler.lap('replay_sample')
+            self.trainer.train_step(states, actions, rewards, next_states, dones)
+            if self.profiler is not None:
+                self.profiler.lap('train_step')
     
     def train_short_memory(self, state, action, reward, next_state, done):
         self.trainer.train_step(state, action, reward, next_state, done)
     
+    def exploration(self):
+        """Current epsilon; a move is random with probability epsilon / 200"""
+        return max(0, self.epsilon_start - self.epsilon_decay * self.n_games)
+    
     def get_action(self, state):
         # random moves: tradeoff exploration / exploitation
-        self.epsilon = max(0, 80 - self.n_games)  # Ensure epsilon doesn't go negative
+        self.epsilon = self.exploration()
         final_move = [0, 0, 0]
         if random.randint(0, 200) < self.epsilon:
             move = random.randint(0, 2)
             final_move[move] = 1
+        elif self.qtable is not None:
+            self.qtable.maybe_refresh(self.trainer.updates)
+            final_move[self.qtable.action(state)] = 1
         else:
             state0 = torch.tensor(state, dtype=torch.float)
-            prediction = self.model(state0)
+            with torch.inference_mode():
+                prediction = self.forward(state0)
             move = torch.argmax(prediction).item()
             final_move[move] = 1
         
         return final_move
+    
+    def get_actions(self, states):
+        """Epsilon-greedy action indices for a batch of states (one row per game).
 
-# Constants
-BATCH_SIZE = 1000
-LR = 0.001
-
+        One forward pass serves every game; exploration is drawn per game with
+        the same odds as get_action.
+        """
+        self.epsilon = self.exploration()
+        if self.qtable is not None:
+            self.qtable.maybe_refresh(self.trainer.updates)
+            actions = self.qtable.actions[pack_states(states)]
+        else:
+            with torch.inference_mode():
+                q_values = self.forward(torch.as_tensor(states, dtype=torch.float))
+            actions = torch.argmax(q_values, dim=1).numpy()
+        explore = np.random.randint(0, 201, len(actions)) < self.epsilon
+        if explore.any():
+            actions[explore] = np.random.randint(0, 3, explore.sum())
+        return actions
@@ -0,0 +1,129 @@
+"""The agent's 11-feature state, computed for one board or a batch of boards.
+
+Feature layout (all 0/1, float32):
+    0-2   danger straight, right, left
+    3-6   moving left, right, up, down
+    7-10  food left, right, up, down
+
+Each feature is one bit of an 11-bit state code (feature k is bit k), so a
+state can be represented as an integer in [0, 2048). pack_states and
+unpack_states convert between feature rows and codes in uint16;
+pack_transitions also folds the action index (bits 11-12) and the done flag
+(bit 13) into the state's word, so a transition takes 4 bytes plus its reward.
+"""
+import numpy as np
+from core import Direction, BLOCK_SIZE
+
+N_FEATURES = 11
+N_CODES = 1 << N_FEATURES
+STATE_MASK = N_CODES - 1
+ACTION_SHIFT = N_FEATURES  # action index in bits 11-12 of a packed transition
+DONE_SHIFT = N_FEATURES + 2  # done flag in bit 13
+
+# Directions in clockwise order, matching SnakeGame._move: right, down, left, up
+CLOCK_WISE = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
+DIRECTION_INDEX = {d: i for i, d in enumerate(CLOCK_WISE)}
+DX = np.array([1, 0, -1, 0], dtype=np.int32)
+DY = np.array([0, 1, 0, -1], dtype=np.int32)
+# Action index -> change of clockwise index: [straight, right turn, left turn]
+TURNS = np.array([0, 1, -1], dtype=np.int32)
+# Column of each clockwise direction in the [left, right, up, down] block
+DIR_FEATURE = np.array([1, 3, 0, 2])
+
+# Row c holds the features of state code c
+UNPACK_TABLE = ((np.arange(N_CODES)[:, None] >> np.arange(N_FEATURES)) & 1).astype(np.float32)
+# Feature k is worth 2^k; float32 sums of distinct powers below 2^24 are exact
+BIT_WEIGHTS = (1 << np.arange(N_FEATURES)).astype(np.float32)
+
+# Plain-Python table for the single-board path (avoids NumPy scalar overhead):
+# per direction, its state bit and the (dx, dy) of the cells straight/right/left
+_DIRECTIONS = {d: (1 << (3 + int(DIR_FEATURE[i])),) +
+                  tuple(int(a[(i + t) % 4]) for t in (0, 1, -1) for a in (DX, DY))
+               for i, d in enumerate(CLOCK_WISE)}
+
+def state_code(game):
+    """11-bit state code of a SnakeGame"""
+    cols, rows = game.cols, game.rows
+    occupancy = game.occupancy
+    head = game.head
+    hx = head.x // BLOCK_SIZE
+    hy = head.y // BLOCK_SIZE
+    code, sx, sy, rx, ry, lx, ly = _DIRECTIONS[game.direction]
+
+    # Danger straight (bit 0), right (bit 1), left (bit 2)
+    x = hx + sx
+    y = hy + sy
+    if not (0 <= x < cols and 0 <= y < rows) or occupancy[y * cols + x]:
+        code |= 1
+    x = hx + rx
+    y = hy + ry
+    if not (0 <= x < cols and 0 <= y < rows) or occupancy[y * cols + x]:
+        code |= 2
+    x = hx + lx
+    y = hy + ly
+    if not (0 <= x < cols and 0 <= y < rows) or occupancy[y * cols + x]:
+        code |= 4
+
+    # No food left once the board is full (a won game)
+    food = game.food if game.food is not None else head
+    if food.x < head.x:
+        code |= 128
+    elif food.x > head.x:
+        code |= 256
+    if food.y < head.y:
+        code |= 512
+    elif food.y > head.y:
+        code |= 1024
+    return code
+
+def game_features(game):
+    """float32 feature vector of a SnakeGame"""
+    return UNPACK_TABLE[state_code(game)].copy()
+
+def batch_features(head_x, head_y, direction, food_x, food_y, occupied, cols, rows):
+    """float32 features (n, 11) for n boards given as arrays in grid cells.
+
+    direction holds clockwise indices and occupied is an (n, cols * rows)
+    boolean grid of snake segments.
+    """
+    n = len(head_x)
+    idx = np.arange(n)
+    state = np.zeros((n, N_FEATURES), dtype=np.float32)
+
+    # Danger straight, right, left
+    for k, turn in enumerate(TURNS):
+        d = (direction + turn) % 4
+        px = head_x + DX[d]
+        py = head_y + DY[d]
+        out = (px < 0) | (px >= cols) | (py < 0) | (py >= rows)
+        cell = np.where(out, 0, py * cols + px)
+        state[:, k] = out | occupied[idx, cell]
+
+    # Move direction
+    state[idx, 3 + DIR_FEATURE[direction]] = 1
+
+    # Food location
+    state[:, 7] = food_x < head_x
+    state[:, 8] = food_x > head_x
+    state[:, 9] = food_y < head_y
+    state[:, 10] = food_y > head_y
+    return state
+
+def pack_states(states):
+    """uint16 state codes of 0/1 feature rows (shape (..., 11) -> (...))"""
+    return (np.asarray(states, dtype=np.float32) @ BIT_WEIGHTS).astype(np.uint16)
+
+def unpack_states(codes):
+    """float32 feature rows (..., 11) of state codes (packed transitions too)"""
+    return UNPACK_TABLE[np.asarray(codes) & STATE_MASK]
+
+def pack_transitions(states, actions, dones):
+    """uint16 words holding state code, action index and done flag"""
+    return (pack_states(states) | (np.asarray(actions, dtype=np.uint16) << ACTION_SHIFT)
+            | (np.asarray(dones, dtype=np.uint16) << DONE_SHIFT))
+
+def unpack_transitions(codes):
+    """(states float32 (n, 11), actions int64, dones bool) of packed words"""
+    codes = np.asarray(codes)
+    return (UNPACK_TABLE[codes & STATE_MASK], (codes >> ACTION_SHIFT & 3).astype(np.int64),
+            (codes >> DONE_SHIFT & 1).astype(bool))
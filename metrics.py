@@ -0,0 +1,116 @@
+"""Append-only, on-disk log of per-game training metrics.
+
+The file is a 16-byte header followed by fixed-size little-endian records
+(RECORD_DTYPE), one per finished game. MetricsLog buffers records in a
+preallocated array and writes them in batches, so memory use does not grow
+with the length of the run. load_metrics memory-maps the file as a NumPy
+structured array, so even millions of games load instantly:
+
+    m = load_metrics('model/metrics.bin')
+    m['score'].mean(), np.bincount(m['score'])
+
+A partial record left by a crash is ignored when loading.
+
+Profiling reports (see profiling.py) go to a JSON-lines file next to the
+log, e.g. metrics.profile.jsonl; load them with load_profile.
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Constants
+MAGIC = b'SNAKEMET'
+VERSION = 1
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),  # Unix time the game finished
+    ('game', '<u4'),
+    ('score', '<u4'),
+    ('mean_score', '<f4'),
+    ('record', '<u4'),
+    ('epsilon', '<f4'),
+    ('memory_size', '<u4'),
+])
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4')])
+FLUSH_EVERY = 100  # games buffered in memory before a write
+
+def _check_header(f, path):
+    header = np.frombuffer(f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)
+    if (len(header) != 1 or header['magic'][0] != MAGIC or header['version'][0] != VERSION
+            or header['record_size'][0] != RECORD_DTYPE.itemsize):
+        raise ValueError(f"{path} is not a version {VERSION} metrics log")
+
+class MetricsLog:
+    """Appends one record per game to path, writing every flush_every games"""
+    def __init__(self, path, flush_every=FLUSH_EVERY):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                _check_header(f, path)
+            # Drop a partial record left by a crash so new records stay aligned
+            body = os.path.getsize(path) - HEADER_DTYPE.itemsize
+            os.truncate(path, HEADER_DTYPE.itemsize + body - body % RECORD_DTYPE.itemsize)
+            self.file = open(path, 'ab')
+        else:
+            self.file = open(path, 'wb')
+            header = np.array([(MAGIC, VERSION, RECORD_DTYPE.itemsize)], dtype=HEADER_DTYPE)
+            self.file.write(header.tobytes())
+            self.file.flush()
+        self.buffer = np.zeros(flush_every, dtype=RECORD_DTYPE)
+        self.n = 0  # records in the buffer
+
+    def append(self, game, score, mean_score, record, epsilon, memory_size):
+        """Record one finished game"""
+        self.buffer[self.n] = (time.time(), game, score, mean_score, record, epsilon, memory_size)
+        self.n += 1
+        if self.n == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records to disk"""
+        if self.n:
+            self.file.write(self.buffer[:self.n].tobytes())
+            self.file.flush()
+            self.n = 0
+
+    def write_profile(self, game, report):
+        """Append a profiling report taken at the given game"""
+        with open(profile_path(self.path), 'a') as f:
+            f.write(json.dumps({'time': time.time(), 'game': game, **report}) + '\n')
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def profile_path(path):
+    """Profiling reports file belonging to the metrics log at path"""
+    return os.path.splitext(path)[0] + '.profile.jsonl'
+
+def load_profile(path):
+    """Profiling reports logged next to the metrics log at path, oldest first"""
+    with open(profile_path(path)) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def load_metrics(path):
+    """All records in path as a read-only structured array (memory-mapped)"""
+    with open(path, 'rb') as f:
+        _check_header(f, path)
+    n = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize
+    if n == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_DTYPE.itemsize, shape=(n,))
+
+if __name__ == '__main__':
+    # Quick summary of a log: python metrics.py [model/metrics.bin]
+    path = sys.argv[1] if len(sys.argv) > 1 else './model/metrics.bin'
+    m = load_metrics(path)
+    print(f"{path}: {len(m)} games")
+    if len(m):
+        scores = np.asarray(m['score'])
+        hours = (m['time'][-1] - m['time'][0]) / 3600
+        print(f"  Record Score: {scores.max()}")
+        print(f"  Mean Score: {scores.mean():.2f} (last 100: {scores[-100:].mean():.2f})")
+        print(f"  Span: {hours:.2f} hours")
@@ -0,0 +1,81 @@
+"""Lightweight per-phase timing for the training loop.
+
+The loop calls lap(name) after each phase; the time since the previous lap
+is added to that phase's histogram (log-scale buckets, four per power of two
+nanoseconds, i.e. within 25%), so timing a phase costs one clock read and a
+few integer operations. report() summarises the phases and turns cumulative
+counters (steps, gradient steps, samples) into rates over the same window.
+
+    python train.py --headless --profile 50    # report every 50 games
+"""
+import time
+
+N_BUCKETS = 4 * 64  # bucket 4 * b + k: laps of b bits whose next two bits are k
+
+class PhaseProfiler:
+    def __init__(self):
+        self.reset()
+
+    def reset(self, **counters):
+        """Start a new reporting window; counters are the current totals"""
+        self.phases = {}  # name -> [calls, total_ns, max_ns, buckets]
+        self._counters = counters
+        self._last = self._window_start = time.perf_counter_ns()
+
+    def lap(self, name):
+        """Charge the time since the previous lap to phase name"""
+        now = time.perf_counter_ns()
+        ns = now - self._last
+        self._last = now
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0, 0, 0, [0] * N_BUCKETS]
+        phase[0] += 1
+        phase[1] += ns
+        if ns > phase[2]:
+            phase[2] = ns
+        bits = ns.bit_length()
+        if bits > 2:
+            phase[3][bits << 2 | (ns >> (bits - 3)) & 3] += 1
+        else:
+            phase[3][bits << 2] += 1
+
+    def report(self, **counters):
+        """Per-phase statistics of the current window, and the rate of each
+        counter (given as a running total) since the window started"""
+        elapsed = (time.perf_counter_ns() - self._window_start) / 1e9
+        phases = {}
+        for name, (calls, total_ns, max_ns, buckets) in self.phases.items():
+            phases[name] = {
+                'calls': calls,
+                'total_s': total_ns / 1e9,
+                'share': total_ns / 1e9 / elapsed,
+                'mean_us': total_ns / calls / 1e3,
+                # Upper edge of the bucket holding the percentile
+                'p50_us': min(max_ns, _percentile(buckets, calls, 0.50)) / 1e3,
+                'p99_us': min(max_ns, _percentile(buckets, calls, 0.99)) / 1e3,
+                'max_us': max_ns / 1e3,
+            }
+        rates = {f'{name}_per_sec': (total - self._counters.get(name, 0)) / elapsed
+                 for name, total in counters.items()}
+        return {'seconds': elapsed, 'phases': phases, 'rates': rates}
+
+def _percentile(buckets, calls, q):
+    rank = q * calls
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            bits, k = i >> 2, i & 3
+            return (5 + k) << (bits - 3) if bits > 2 else 2 ** bits
+    return 2 ** (len(buckets) // 4)
+
+def format_report(report):
+    """Console table of a report, slowest phase first"""
+    lines = [f"{'phase':20s} {'share':>6s} {'calls':>8s} {'mean us':>9s} "
+             f"{'p50 us':>9s} {'p99 us':>9s} {'max us':>10s}"]
+    for name, p in sorted(report['phases'].items(), key=lambda item: -item[1]['total_s']):
+        lines.append(f"{name:20s} {p['share']:6.1%} {p['calls']:8d} {p['mean_us']:9.1f} "
+                     f"{p['p50_us']:9.1f} {p['p99_us']:9.1f} {p['max_us']:10.1f}")
+    lines.append('  '.join(f'{name}: {rate:,.1f}' for name, rate in report['rates'].items()))
+    return '\n'.join(lines)
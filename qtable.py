@@ -0,0 +1,130 @@
+"""Q-values of every state code, so acting is an array lookup.
+
+The agent's state is 11 binary features, of which at most REACHABLE_CODES
+(288 of the 2048 codes) can occur: exactly one move direction, and food
+left/right and up/down are each exclusive. QTableCache evaluates the network
+on all of them in one batched forward pass and serves greedy actions by
+index; it re-evaluates once the trainer has taken refresh_every more
+optimizer steps. A table can be saved as .npz and played with QTablePolicy,
+which needs only NumPy:
+
+    python qtable.py export model/model.pth model/qtable.npz
+    python qtable.py play model/qtable.npz --games 10
+"""
+import argparse
+
+import numpy as np
+
+from features import N_CODES, UNPACK_TABLE, BIT_WEIGHTS, pack_states, state_code
+
+# Constants
+QTABLE_EVERY = 0  # optimizer steps between refreshes during training (0: no table)
+
+def _reachable_codes():
+    codes = np.arange(N_CODES)
+    bits = (codes[:, None] >> np.arange(11)) & 1
+    one_direction = bits[:, 3:7].sum(axis=1) == 1
+    food_x = bits[:, 7] + bits[:, 8] <= 1
+    food_y = bits[:, 9] + bits[:, 10] <= 1
+    return codes[one_direction & food_x & food_y]
+
+REACHABLE_CODES = _reachable_codes()
+
+class QTableCache:
+    """Greedy actions for every reachable state code of a model.
+
+    forward computes model(x) (see dqn_agent.compile_forward). Call
+    maybe_refresh(trainer.updates) before lookups; the table is rebuilt when
+    refresh_every optimizer steps have been taken since it was last built
+    (refresh_every=0: only when refresh() is called).
+    """
+    def __init__(self, forward, refresh_every=QTABLE_EVERY, codes=REACHABLE_CODES):
+        self.forward = forward
+        self.refresh_every = refresh_every
+        self.codes = codes
+        self.q = np.zeros((N_CODES, 3), dtype=np.float32)
+        self.actions = np.zeros(N_CODES, dtype=np.int64)
+        self.built_at = None  # optimizer steps when last built
+
+    def refresh(self, updates=0):
+        """Re-evaluate the network on every code"""
+        import torch  # only a live network needs torch; QTablePolicy does not
+        with torch.inference_mode():
+            q = self.forward(torch.from_numpy(UNPACK_TABLE[self.codes])).numpy()
+        self.q[self.codes] = q
+        self.actions[self.codes] = q.argmax(axis=1)
+        self.built_at = updates
+
+    def maybe_refresh(self, updates):
+        """Rebuild the table if it is older than refresh_every optimizer steps"""
+        if self.built_at is None or (self.refresh_every
+                                     and updates - self.built_at >= self.refresh_every):
+            self.refresh(updates)
+
+    def action(self, state):
+        """Greedy action index for one 0/1 feature vector"""
+        return int(self.actions[int(np.dot(state, BIT_WEIGHTS))])
+
+    def save(self, path):
+        """Write the table as .npz for QTablePolicy"""
+        np.savez(path, q=self.q, actions=self.actions, codes=self.codes)
+
+class QTablePolicy:
+    """Greedy policy from a saved table; NumPy only"""
+    def __init__(self, path):
+        with np.load(path) as table:
+            self.q = table['q']
+            self.actions = table['actions']
+            self.codes = table['codes']
+
+    def action(self, state):
+        """Greedy action index for one 0/1 feature vector"""
+        return int(self.actions[int(np.dot(state, BIT_WEIGHTS))])
+
+    def actions_for(self, states):
+        """Greedy action indices for a batch of feature rows"""
+        return self.actions[pack_states(states)]
+
+    def play(self, game):
+        """Action index for the current position of a SnakeGame"""
+        return int(self.actions[state_code(game)])
+
+def export(model_path, out_path):
+    """Build the table of a saved Linear_QNet and write it to out_path"""
+    import torch
+    from dqn_agent import Linear_QNet
+    weights = torch.load(model_path)
+    model = Linear_QNet(11, weights['linear1.weight'].shape[0], 3)
+    model.load_state_dict(weights)
+    table = QTableCache(model)
+    table.refresh()
+    table.save(out_path)
+    return table
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export or play a Q-value table')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('export', help='build the table of a saved model')
+    p.add_argument('model', nargs='?', default='./model/model.pth')
+    p.add_argument('out', nargs='?', default='./model/qtable.npz')
+    p = sub.add_parser('play', help='play headless games with a table (no torch needed)')
+    p.add_argument('table', nargs='?', default='./model/qtable.npz')
+    p.add_argument('--games', type=int, default=10)
+    p.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.command == 'export':
+        export(args.model, args.out)
+        print(f"Wrote the Q-values of {len(REACHABLE_CODES)} states to {args.out}")
+    else:
+        from snake_game import SnakeGame
+        policy = QTablePolicy(args.table)
+        game = SnakeGame(render=False, seed=args.seed)
+        moves = np.eye(3, dtype=int)
+        scores = []
+        while len(scores) < args.games:
+            _, done, score, _ = game.play_step(moves[policy.play(game)])
+            if done:
+                scores.append(score)
+                print(f"Game {len(scores):3d} | Score: {score:3d}")
+                game.reset()
+        print(f"Mean Score: {np.mean(scores):.2f} | Record: {max(scores)}")
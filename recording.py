@@ -0,0 +1,153 @@
+"""Compact recordings of played games, for replaying them later.
+
+A game is fully determined by its board size, its episode seed (see
+SnakeGame.reset) and its moves, so that is all a recording keeps: a 16-byte
+header per game, the action indices packed 2 bits each, and the per-step
+rewards as int8 (a check that the replay matches). That is 1.25 bytes per
+move. EpisodeRecorder appends games to a file during training; replay.py
+rebuilds and renders them.
+
+File layout: the file header (FILE_DTYPE), then per game an EPISODE_DTYPE
+header followed by ceil(steps / 4) action bytes and steps reward bytes.
+An incomplete game left by a crash is dropped when the file is reopened.
+
+    rec = load_recording('model/episodes.bin')
+    best = max(rec.episodes, key=lambda e: e.score)
+    unpack_actions(best)  # action index per move
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Constants
+MAGIC = b'SNAKEREC'
+VERSION = 1
+FILE_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('w', '<u2'), ('h', '<u2')])
+EPISODE_DTYPE = np.dtype([
+    ('game', '<u4'),  # game number in the training run
+    ('seed', '<u4'),  # SnakeGame.episode_seed
+    ('steps', '<u4'),
+    ('score', '<u2'),
+    ('flags', '<u2'),
+])
+FLAG_RECORD = 1  # the game set a new record
+FLUSH_BYTES = 1 << 16  # buffered before a write
+
+Episode = namedtuple('Episode', 'game seed steps score record actions rewards')
+Recording = namedtuple('Recording', 'w h episodes')
+
+def _episode_bytes(steps):
+    return EPISODE_DTYPE.itemsize + (steps + 3) // 4 + steps
+
+def _scan(buf):
+    """Episodes in buf (bytes after the file header) and the end of the last complete one"""
+    episodes = []
+    pos = 0
+    while pos + EPISODE_DTYPE.itemsize <= len(buf):
+        head = np.frombuffer(buf, EPISODE_DTYPE, 1, pos)[0]
+        steps = int(head['steps'])
+        end = pos + _episode_bytes(steps)
+        if end > len(buf):
+            break
+        start = pos + EPISODE_DTYPE.itemsize
+        episodes.append(Episode(int(head['game']), int(head['seed']), steps, int(head['score']),
+                                bool(head['flags'] & FLAG_RECORD),
+                                np.frombuffer(buf, np.uint8, (steps + 3) // 4, start),
+                                np.frombuffer(buf, np.int8, steps, start + (steps + 3) // 4)))
+        pos = end
+    return episodes, pos
+
+def _complete_end(f, size):
+    """Offset just past the last complete game: seeks from header to header,
+    reading only EPISODE_DTYPE.itemsize bytes per game"""
+    pos = FILE_DTYPE.itemsize
+    while pos + EPISODE_DTYPE.itemsize <= size:
+        f.seek(pos)
+        steps = int(np.frombuffer(f.read(EPISODE_DTYPE.itemsize), EPISODE_DTYPE)['steps'][0])
+        end = pos + _episode_bytes(steps)
+        if end > size:
+            break
+        pos = end
+    return pos
+
+def _read_header(f, path):
+    header = np.frombuffer(f.read(FILE_DTYPE.itemsize), dtype=FILE_DTYPE)
+    if len(header) != 1 or header['magic'][0] != MAGIC or header['version'][0] != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} episode recording")
+    return int(header['w'][0]), int(header['h'][0])
+
+def pack_actions(actions):
+    """2-bit packing of action indices (0-2), four per byte, first in the low bits"""
+    a = np.zeros((len(actions) + 3) // 4 * 4, dtype=np.uint8)
+    a[:len(actions)] = actions
+    return a[0::4] | a[1::4] << 2 | a[2::4] << 4 | a[3::4] << 6
+
+def unpack_actions(episode):
+    """Action index of every move of an Episode"""
+    packed = episode.actions
+    return (packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8) & 3).ravel()[:episode.steps]
+
+class EpisodeRecorder:
+    """Appends finished games to path: begin(seed) when a game starts,
+    step(action, reward) after every move, end(...) when it is over"""
+    def __init__(self, path, w, h):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                if _read_header(f, path) != (w, h):
+                    raise ValueError(f"{path} records a different board size than {w}x{h}")
+                end = _complete_end(f, os.path.getsize(path))
+            # Drop a partial game left by a crash so new games stay aligned
+            os.truncate(path, end)
+            self.file = open(path, 'ab')
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(np.array([(MAGIC, VERSION, w, h)], dtype=FILE_DTYPE).tobytes())
+            self.file.flush()
+        self.buffer = bytearray()
+        self.seed = None
+        self.actions = []
+        self.rewards = []
+
+    def begin(self, seed):
+        """Start recording a game with this episode seed"""
+        self.seed = seed
+        self.actions.clear()
+        self.rewards.clear()
+
+    def step(self, action, reward):
+        """Record one move: its action index and reward"""
+        self.actions.append(action)
+        self.rewards.append(reward)
+
+    def end(self, game, score, record=False):
+        """Finish the current game; record marks a new high score"""
+        steps = len(self.actions)
+        head = np.array([(game, self.seed, steps, score, FLAG_RECORD if record else 0)],
+                        dtype=EPISODE_DTYPE)
+        self.buffer += head.tobytes()
+        self.buffer += pack_actions(self.actions).tobytes()
+        self.buffer += np.array(self.rewards, dtype=np.int8).tobytes()
+        if len(self.buffer) >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered games to disk"""
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def load_recording(path):
+    """Board size and every complete game in path (their arrays share one buffer)"""
+    with open(path, 'rb') as f:
+        w, h = _read_header(f, path)
+        body = f.read()
+    episodes, _ = _scan(body)
+    return Recording(w, h, episodes)
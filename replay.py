@@ -0,0 +1,122 @@
+"""Rebuild and watch games recorded during training (see recording.py).
+
+Each game is replayed from its episode seed and moves, so what you see is
+exactly what was played, however fast training ran:
+
+    python replay.py --list                 # recorded games
+    python replay.py --records              # every record-breaking game
+    python replay.py --game 412 --speed 10  # one game, 10 moves per second
+    python replay.py --best --step          # frame by frame (space/right: next move)
+    python replay.py --verify               # headless check of every game
+"""
+import argparse
+
+import numpy as np
+
+from recording import load_recording, unpack_actions
+from snake_game import SnakeGame, GameRenderer, SPEED
+
+MOVES = np.eye(3, dtype=int)
+
+def rebuild(recording, episode):
+    """Replay episode headlessly, yielding (game, reward, done) after every move"""
+    game = SnakeGame(recording.w, recording.h, render=False)
+    game.reset(episode_seed=episode.seed)
+    for action in unpack_actions(episode):
+        reward, done, _, _ = game.play_step(MOVES[action])
+        yield game, reward, done
+
+def verify(recording, episode):
+    """True if replaying episode reproduces its rewards, length and score"""
+    rewards = []
+    game = None
+    for game, reward, done in rebuild(recording, episode):
+        rewards.append(reward)
+    return (np.array_equal(rewards, episode.rewards) and done
+            and game.score == episode.score) if game is not None else episode.steps == 0
+
+def _wait_for_key(renderer):
+    # Frame-by-frame mode: True to advance, False to quit
+    pygame = renderer.pygame
+    while True:
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            return False
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if renderer.quit_button_rect.collidepoint(event.pos):
+                return False
+        if event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_SPACE, pygame.K_RIGHT, pygame.K_n):
+                return True
+            if event.key in (pygame.K_ESCAPE, pygame.K_q):
+                return False
+
+def watch(recording, episodes, speed=SPEED, step=False):
+    """Render episodes one after another; returns early if the window is closed"""
+    renderer = GameRenderer(recording.w, recording.h, speed)
+    pygame = renderer.pygame
+    # Record and mean score as they stood when each game was played
+    scores = np.array([e.score for e in recording.episodes])
+    index = {id(e): i for i, e in enumerate(recording.episodes)}
+    try:
+        for episode in episodes:
+            i = index[id(episode)]
+            record, mean = int(scores[:i + 1].max()), float(scores[:i + 1].mean())
+            pygame.display.set_caption(f'Snake RL replay - game {episode.game}, score {episode.score}')
+            for game, _, done in rebuild(recording, episode):
+                renderer.draw(game, episode.game, record, mean)
+                if step:
+                    if not _wait_for_key(renderer):
+                        return
+                else:
+                    if renderer.poll_quit():
+                        return
+                    if speed:
+                        renderer.clock.tick(speed)
+            pygame.time.wait(500)  # linger on the final position
+    finally:
+        renderer.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded training games')
+    parser.add_argument('path', nargs='?', default='./model/episodes.bin')
+    which = parser.add_mutually_exclusive_group()
+    which.add_argument('--game', type=int, nargs='+', metavar='N', help='replay these game numbers')
+    which.add_argument('--best', action='store_true', help='replay the highest-scoring game')
+    which.add_argument('--records', action='store_true',
+                       help='replay every game that set a new record (default)')
+    which.add_argument('--last', type=int, metavar='N', help='replay the last N games')
+    parser.add_argument('--speed', type=float, default=SPEED,
+                        help=f'moves per second (default: {SPEED}; 0: as fast as possible)')
+    parser.add_argument('--step', action='store_true', help='advance one move per key press')
+    parser.add_argument('--list', action='store_true', help='list the recorded games and exit')
+    parser.add_argument('--verify', action='store_true',
+                        help='replay every game headlessly and check it matches the recording')
+    args = parser.parse_args()
+
+    recording = load_recording(args.path)
+    episodes = recording.episodes
+    print(f"{args.path}: {len(episodes)} games on a {recording.w}x{recording.h} board, "
+          f"{sum(e.steps for e in episodes)} moves")
+    if args.list:
+        for e in episodes:
+            print(f"Game {e.game:6d} | Score: {e.score:3d} | Moves: {e.steps:5d}"
+                  f"{' | NEW RECORD' if e.record else ''}")
+    elif args.verify:
+        bad = [e.game for e in episodes if not verify(recording, e)]
+        print(f"{len(episodes) - len(bad)} games replay exactly"
+              + (f"; mismatched: {bad}" if bad else ""))
+    else:
+        if args.game:
+            wanted = set(args.game)
+            selected = [e for e in episodes if e.game in wanted]
+        elif args.best:
+            selected = [max(episodes, key=lambda e: e.score)] if episodes else []
+        elif args.last:
+            selected = episodes[-args.last:]
+        else:
+            selected = [e for e in episodes if e.record]
+        if not selected:
+            print("No matching games")
+        else:
+            watch(recording, selected, speed=args.speed, step=args.step)
@@ -0,0 +1,402 @@
+import json
+import os
+
+import numpy as np
+import torch
+
+from features import (N_FEATURES, ACTION_SHIFT, DONE_SHIFT, BIT_WEIGHTS, pack_states,
+                      unpack_states, pack_transitions, unpack_transitions)
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer of transitions in preallocated NumPy arrays.
+
+    Actions are stored as indices (0 straight, 1 right, 2 left). Appending is
+    O(1) and sampling only touches the sampled rows, so its cost depends on
+    the batch size, not on how full the buffer is.
+
+    With a path, the arrays are memory-mapped .npy files in that directory
+    (created if missing) plus a small meta.json with the write position, so
+    the memory survives restarts and is paged in lazily. Call flush() to
+    record the position. readonly=True opens an existing buffer for sampling
+    only; any number of processes can do so and share the same pages
+    instead of each holding a copy (refresh() picks up newer transitions).
+    Opening a path for writing with another capacity or packed setting
+    rewrites the files in the new layout, keeping the newest transitions
+    that fit.
+
+    packed=True stores each transition in 6 bytes instead of 101: the state,
+    action and done flag in one uint16 word, the next state's code in
+    another (see features.pack_transitions) and the reward as float16 (exact
+    for the game's -10/0/10). Batches are unpacked into the same float32
+    tensors, so callers cannot tell the difference; only 0/1 features of
+    size 11 can be packed.
+    """
+    def __init__(self, capacity, state_size=11, seed=None, path=None, readonly=False,
+                 packed=False):
+        if packed and state_size != N_FEATURES:
+            raise ValueError(f"only {N_FEATURES}-feature states can be packed, not {state_size}")
+        self.capacity = capacity
+        self.state_size = state_size
+        self.packed = packed
+        self.path = path
+        self.readonly = readonly
+        self.pos = 0  # next slot to write
+        self.size = 0
+        if path is None:
+            for name, dtype, shape in self._fields():
+                setattr(self, name, np.zeros(shape, dtype=dtype))
+        else:
+            self._open(path, readonly)
+        self.rng = np.random.default_rng(seed)
+
+    def _fields(self):
+        # (name, dtype, shape) of each stored array
+        if self.packed:
+            return (('codes', np.uint16, (self.capacity,)),  # state | action | done
+                    ('next_codes', np.uint16, (self.capacity,)),
+                    ('rewards', np.float16, (self.capacity,)))
+        return (('states', np.float32, (self.capacity, self.state_size)),
+                ('actions', np.int64, (self.capacity,)),
+                ('rewards', np.float32, (self.capacity,)),
+                ('next_states', np.float32, (self.capacity, self.state_size)),
+                ('dones', bool, (self.capacity,)))
+
+    def _open(self, path, readonly):
+        meta_path = os.path.join(path, 'meta.json')
+        carried = None  # transitions converted from another layout
+        mode = 'w+'
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            packed = meta.get('packed', False)
+            if meta['state_size'] != self.state_size or (
+                    readonly and (meta['capacity'], packed) != (self.capacity, self.packed)):
+                raise ValueError(f"replay memory in {path} holds {meta['capacity']} x "
+                                 f"{meta['state_size']}{' packed' if packed else ''} transitions, "
+                                 f"not {self.capacity} x {self.state_size}"
+                                 f"{' packed' if self.packed else ''}")
+            if (meta['capacity'], packed) != (self.capacity, self.packed):
+                carried = self._take_transitions(path, meta)
+            else:
+                mode = 'r' if readonly else 'r+'
+                self.pos = meta['pos']
+                self.size = meta['size']
+        elif readonly:
+            raise FileNotFoundError(f"no replay memory in {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+        for name, dtype, shape in self._fields():
+            file_name = os.path.join(path, name + '.npy')
+            if mode == 'w+':
+                array = np.lib.format.open_memmap(file_name, mode, dtype=dtype, shape=shape)
+            else:
+                array = np.lib.format.open_memmap(file_name, mode)
+            setattr(self, name, array)
+        if carried is not None:
+            n = len(carried[1])
+            self._store(slice(0, n), *carried)
+            self.pos = n % self.capacity
+            self.size = n
+        if mode == 'w+':
+            self.flush()
+
+    def _take_transitions(self, path, meta):
+        # The newest transitions of the memory in path that fit this buffer,
+        # oldest first, unpacked; the old files are then removed
+        old = ReplayBuffer(meta['capacity'], meta['state_size'], path=path, readonly=True,
+                           packed=meta.get('packed', False))
+        n = min(old.size, self.capacity)
+        rows = tuple(t.numpy() for t in old.batch((old.pos - n + np.arange(n)) % old.capacity))
+        names = [name for name, _, _ in old._fields()]
+        del old  # unmap the old files before removing them
+        os.remove(os.path.join(path, 'meta.json'))
+        for name in names:
+            os.remove(os.path.join(path, name + '.npy'))
+        return rows
+
+    def flush(self):
+        """Record the write position of a file-backed buffer (no-op in RAM).
+
+        The array data itself reaches the files through the OS page cache.
+        """
+        if self.path is None or self.readonly:
+            return
+        meta_path = os.path.join(self.path, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'capacity': self.capacity, 'state_size': self.state_size,
+                       'packed': self.packed, 'pos': self.pos, 'size': self.size}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def refresh(self):
+        """Re-read the write position of a read-only, file-backed buffer"""
+        with open(os.path.join(self.path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.pos = meta['pos']
+        self.size = meta['size']
+
+    def close(self):
+        """Flush a file-backed buffer and write its pages to disk"""
+        if self.path is not None and not self.readonly:
+            for name, _, _ in self._fields():
+                getattr(self, name).flush()
+            self.flush()
+
+    def __len__(self):
+        return self.size
+
+    def append(self, state, action, reward, next_state, done):
+        """Store one transition, overwriting the oldest once full"""
+        i = self.pos
+        if self.packed:
+            # Python ints: NumPy's per-scalar overhead would dominate a single row
+            self.codes[i] = (int(np.dot(state, BIT_WEIGHTS)) | int(action) << ACTION_SHIFT
+                             | bool(done) << DONE_SHIFT)
+            self.next_codes[i] = int(np.dot(next_state, BIT_WEIGHTS))
+            self.rewards[i] = reward
+        else:
+            self._store(i, state, action, reward, next_state, done)
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """Store a batch of transitions (arrays with a leading batch axis)"""
+        n = len(actions)
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self._store(idx, states, actions, rewards, next_states, dones)
+        self.pos = int((self.pos + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+
+    def extend_packed(self, codes, rewards, next_codes):
+        """Store a batch given as packed words (see features.pack_transitions)"""
+        n = len(codes)
+        idx = (self.pos + np.arange(n)) % self.capacity
+        if self.packed:
+            self.codes[idx] = codes
+            self.next_codes[idx] = next_codes
+            self.rewards[idx] = rewards
+        else:
+            states, actions, dones = unpack_transitions(codes)
+            self._store(idx, states, actions, rewards, unpack_states(next_codes), dones)
+        self.pos = int((self.pos + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+
+    def _store(self, idx, states, actions, rewards, next_states, dones):
+        if self.packed:
+            self.codes[idx] = pack_transitions(states, actions, dones)
+            self.next_codes[idx] = pack_states(next_states)
+        else:
+            self.states[idx] = states
+            self.actions[idx] = actions
+            self.next_states[idx] = next_states
+            self.dones[idx] = dones
+        self.rewards[idx] = rewards
+
+    def sample(self, batch_size):
+        """Random batch (with replacement) as tensors, or everything if the
+        buffer holds no more than batch_size transitions"""
+        if self.size <= batch_size:
+            idx = np.arange(self.size)
+        else:
+            idx = self.rng.integers(0, self.size, batch_size)
+        return self.batch(idx)
+
+    def batch(self, idx):
+        """Rows idx as (states, actions, rewards, next_states, dones) tensors.
+
+        The fancy index makes one copy; torch.from_numpy wraps it without another.
+        """
+        if self.packed:
+            states, actions, dones = unpack_transitions(self.codes[idx])
+            return (torch.from_numpy(states),
+                    torch.from_numpy(actions),
+                    torch.from_numpy(self.rewards[idx].astype(np.float32)),
+                    torch.from_numpy(unpack_states(self.next_codes[idx])),
+                    torch.from_numpy(dones))
+        return (torch.from_numpy(self.states[idx]),
+                torch.from_numpy(self.actions[idx]),
+                torch.from_numpy(self.rewards[idx]),
+                torch.from_numpy(self.next_states[idx]),
+                torch.from_numpy(self.dones[idx]))
+
+    def state_dict(self):
+        """Copy of the stored transitions and sampling RNG, for checkpoints"""
+        n = self.size
+        state = {'capacity': self.capacity, 'pos': self.pos, 'size': n, 'packed': self.packed,
+                 'rng': self.rng.bit_generator.state}
+        for name, _, _ in self._fields():
+            state[name] = getattr(self, name)[:n].copy()
+        return state
+
+    @staticmethod
+    def _newest_rows(state, capacity):
+        # Rows of a state_dict with its newest transitions that fit capacity, oldest first
+        n = state['size']
+        k = min(n, capacity)
+        return (state['pos'] - k + np.arange(k)) % max(n, 1)
+
+    def load_state_dict(self, state):
+        """Restore a state_dict, converting between packed and unpacked; from
+        a memory of another capacity, the newest transitions that fit are kept"""
+        packed = state.get('packed', False)
+        state_size = N_FEATURES if packed else state['states'].shape[1]
+        if state_size != self.state_size:
+            raise ValueError(f"checkpoint memory holds {state_size}-feature states, "
+                             f"this one {self.state_size}")
+        n = state['size']
+        pos = state['pos']
+        if state['capacity'] != self.capacity:
+            rows = self._newest_rows(state, self.capacity)
+            names = ('codes', 'next_codes', 'rewards') if packed else (
+                'states', 'actions', 'rewards', 'next_states', 'dones')
+            state = {**state, **{name: state[name][rows] for name in names}}
+            n = len(rows)
+            pos = n % self.capacity
+        if packed == self.packed:
+            for name, _, _ in self._fields():
+                getattr(self, name)[:n] = state[name]
+        elif packed:
+            states, actions, dones = unpack_transitions(state['codes'])
+            self._store(slice(0, n), states, actions, state['rewards'],
+                        unpack_states(state['next_codes']), dones)
+        else:
+            self._store(slice(0, n), state['states'], state['actions'], state['rewards'],
+                        state['next_states'], state['dones'])
+        self.pos = pos
+        self.size = n
+        self.rng.bit_generator.state = state['rng']
+
+class SumTree:
+    """Binary tree whose leaves hold priorities and inner nodes their sums.
+
+    Updating a leaf and finding the leaf for a prefix sum are both O(log n).
+    Node 1 is the root; leaf i lives at node size + i.
+    """
+    def __init__(self, capacity):
+        self.size = 1
+        while self.size < capacity:
+            self.size *= 2
+        self.tree = np.zeros(2 * self.size, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, idx):
+        return self.tree[self.size + np.asarray(idx)]
+
+    def set(self, i, priority):
+        """Update a single leaf (fast path for per-step appends)"""
+        tree = self.tree
+        node = self.size + i
+        tree[node] = priority
+        node //= 2
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def update(self, idx, priorities):
+        """Update many leaves at once; one vectorized pass per tree level"""
+        nodes = self.size + np.asarray(idx)
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0]:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Leaf index for each prefix-sum value in [0, total)"""
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.size:
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+        return nodes - self.size
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """Proportional prioritized replay (Schaul et al., 2016) on a SumTree.
+
+    Transitions are sampled with probability p_i^alpha / sum_k p_k^alpha,
+    where p_i is the last absolute TD error plus eps. New transitions get the
+    highest priority seen so far. sample also returns importance-sampling
+    weights (beta annealed towards 1 over beta_steps samples) and the indices
+    to pass back to update_priorities.
+    """
+    def __init__(self, capacity, state_size=11, alpha=0.6, beta=0.4,
+                 beta_steps=100_000, eps=1e-3, seed=None, path=None, readonly=False,
+                 packed=False):
+        super().__init__(capacity, state_size, seed, path, readonly, packed)
+        self.alpha = alpha
+        self.beta_start = beta
+        self.beta_steps = beta_steps
+        self.eps = eps
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.sample_calls = 0
+        if self.size:
+            # Priorities are not persisted: reopened transitions start at max priority
+            self.tree.update(np.arange(self.size), np.full(self.size, self.max_priority ** alpha))
+
+    def append(self, state, action, reward, next_state, done):
+        i = self.pos
+        super().append(state, action, reward, next_state, done)
+        self.tree.set(i, self.max_priority ** self.alpha)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        idx = (self.pos + np.arange(len(actions))) % self.capacity
+        super().extend(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, np.full(len(idx), self.max_priority ** self.alpha))
+
+    def extend_packed(self, codes, rewards, next_codes):
+        idx = (self.pos + np.arange(len(codes))) % self.capacity
+        super().extend_packed(codes, rewards, next_codes)
+        self.tree.update(idx, np.full(len(idx), self.max_priority ** self.alpha))
+
+    @property
+    def beta(self):
+        progress = min(1.0, self.sample_calls / self.beta_steps)
+        return self.beta_start + (1.0 - self.beta_start) * progress
+
+    def sample(self, batch_size):
+        """(states, actions, rewards, next_states, dones, weights, indices)"""
+        total = self.tree.total()
+        # Stratified: one value from each of batch_size equal slices of the total
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+
+        probs = self.tree.get(idx) / total
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.sample_calls += 1
+        return self.batch(idx) + (torch.from_numpy(weights.astype(np.float32)), idx)
+
+    def state_dict(self):
+        state = super().state_dict()
+        state.update(tree=self.tree.tree.copy(), max_priority=self.max_priority,
+                     sample_calls=self.sample_calls)
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        if 'tree' in state and state['capacity'] == self.capacity:
+            self.tree.tree[:] = state['tree']
+        else:
+            self.tree.tree[:] = 0
+            if 'tree' in state:
+                # Another capacity: carry the kept transitions' priorities over
+                leaves = state['tree'][len(state['tree']) // 2:]
+                priorities = leaves[self._newest_rows(state, self.capacity)]
+            else:
+                # Saved from a uniform buffer: every transition starts at max priority
+                priorities = np.full(self.size, self.max_priority ** self.alpha)
+            if self.size:
+                self.tree.update(np.arange(self.size), priorities)
+        if 'tree' in state:
+            self.max_priority = state['max_priority']
+            self.sample_calls = state['sample_calls']
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(idx, priorities ** self.alpha)
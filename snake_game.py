@@ -1,10 +1,7 @@
-import pygame
 import numpy as np
-from enum import Enum
-from collections import namedtuple
+from collections import deque
 import random
-
-pygame.init()
+from core import Direction, Point, BLOCK_SIZE
 
 # Colors
 BLACK = (0, 0, 0)
@@ -14,32 +11,37 @@ GREEN1 = (0, 200, 0)
 GREEN2 = (0, 255, 0)
 BLUE = (0, 0, 255)
 
-# Direction enum
-class Direction(Enum):
-    RIGHT = 1
-    LEFT = 2
-    UP = 3
-    DOWN = 4
-
-Point = namedtuple('Point', 'x, y')
-
 # Game settings
-BLOCK_SIZE = 20
 SPEED = 60
 
 class SnakeGame:
-    def __init__(self, w=640, h=480):
+    """Pure game logic. Pass render=True to attach a pygame window on top.
+
+    seed makes food placement reproducible; VectorSnakeEnv board i with seed s
+    plays exactly like SnakeGame(seed=s + i). Every game draws its own
+    episode_seed from that stream, and food placement depends only on it, so
+    a game can be rebuilt from its episode seed and actions (see replay.py).
+    """
+    def __init__(self, w=640, h=480, render=True, seed=None):
         self.w = w
         self.h = h
-        # Initialize display (visible window size in pixels)
-        self.display = pygame.display.set_mode((self.w, self.h))
-        pygame.display.set_caption('Snake RL - Click Quit to stop')
-        self.clock = pygame.time.Clock()
+        self.rng = random.Random(seed)  # draws one seed per episode
+        # Number of in-bounds cells per axis
+        self.cols = max(1, (self.w - BLOCK_SIZE) // BLOCK_SIZE + 1)
+        self.rows = max(1, (self.h - BLOCK_SIZE) // BLOCK_SIZE + 1)
+        # The renderer (and pygame with it) is only created when requested,
+        # so headless training never touches a display
+        self.renderer = GameRenderer(self.w, self.h) if render else None
+        self.render_enabled = render  # toggled by train.py to skip frames
         self.quit_requested = False
-        self.quit_button_rect = pygame.Rect(self.w - 90, 10, 80, 32)  # set properly in _update_ui
         self.reset()
         
-    def reset(self):
+    def reset(self, episode_seed=None):
+        """Start a new game; food follows episode_seed (default: the next
+        seed drawn from self.rng)"""
+        self.episode_seed = self.rng.getrandbits(32) if episode_seed is None else episode_seed
+        self.food_rng = random.Random(self.episode_seed)
+        
         # Initialize game state
         self.direction = Direction.RIGHT
         
@@ -49,41 +51,81 @@ class SnakeGame:
             (self.head.x // BLOCK_SIZE) * BLOCK_SIZE,
             (self.head.y // BLOCK_SIZE) * BLOCK_SIZE
         )
-        self.snake = [self.head,
-                      Point(self.head.x - BLOCK_SIZE, self.head.y),
-                      Point(self.head.x - (2 * BLOCK_SIZE), self.head.y)]
+        self.snake = deque([self.head,
+                            Point(self.head.x - BLOCK_SIZE, self.head.y),
+                            Point(self.head.x - (2 * BLOCK_SIZE), self.head.y)])
+        self._rebuild_occupancy()
         
         self.score = 0
         self.food = None
         self._place_food()
         self.frame_iteration = 0
+        # Keep the window responsive between games that are not drawn
+        if self.renderer is not None and self.renderer.poll_quit():
+            self.quit_requested = True
         
     def _place_food(self):
-        # Ensure at least 1 cell per axis (avoid empty randint range if w or h < BLOCK_SIZE)
-        ncols = max(1, (self.w - BLOCK_SIZE) // BLOCK_SIZE)
-        nrows = max(1, (self.h - BLOCK_SIZE) // BLOCK_SIZE)
-        x = random.randint(0, ncols) * BLOCK_SIZE
-        y = random.randint(0, nrows) * BLOCK_SIZE
-        self.food = Point(x, y)
-        if self.food in self.snake:
-            self._place_food()
+        # Sample uniformly from the free-cell list: bounded time even when the
+        # board is nearly full. Returns False if there is no free cell left.
+        if not self._free:
+            self.food = None
+            return False
+        cell = self._free[self.food_rng.randrange(len(self._free))]
+        self.food = Point((cell % self.cols) * BLOCK_SIZE, (cell // self.cols) * BLOCK_SIZE)
+        return True
+    
+    def _cell(self, pt):
+        # Index of an in-bounds point in the occupancy grid
+        return (pt.y // BLOCK_SIZE) * self.cols + pt.x // BLOCK_SIZE
+    
+    def _in_bounds(self, pt):
+        return 0 <= pt.x <= self.w - BLOCK_SIZE and 0 <= pt.y <= self.h - BLOCK_SIZE
+    
+    def _rebuild_occupancy(self):
+        # Per-cell count of snake segments, kept in sync with self.snake so that
+        # collision checks and food placement never scan the body
+        self.occupancy = bytearray(self.cols * self.rows)
+        for pt in self.snake:
+            if self._in_bounds(pt):
+                self.occupancy[self._cell(pt)] += 1
+        # Unordered list of free cells plus each cell's position in it (-1 if occupied)
+        self._free = [cell for cell, count in enumerate(self.occupancy) if not count]
+        self._free_pos = [-1] * len(self.occupancy)
+        for i, cell in enumerate(self._free):
+            self._free_pos[cell] = i
+    
+    def _occupy(self, cell):
+        if not self.occupancy[cell]:
+            # Swap-remove the cell from the free list
+            i = self._free_pos[cell]
+            last = self._free.pop()
+            if last != cell:
+                self._free[i] = last
+                self._free_pos[last] = i
+            self._free_pos[cell] = -1
+        self.occupancy[cell] += 1
+    
+    def _vacate(self, cell):
+        self.occupancy[cell] -= 1
+        if not self.occupancy[cell]:
+            self._free_pos[cell] = len(self._free)
+            self._free.append(cell)
     
     def play_step(self, action, game_num=0, record=0, mean_score=0.0):
         self.frame_iteration += 1
+        rendering = self.renderer is not None and self.render_enabled
         # 1. Collect user input (quit button and window close)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.quit_requested = True
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if self.quit_button_rect.collidepoint(event.pos):
-                    self.quit_requested = True
+        if rendering and self.renderer.poll_quit():
+            self.quit_requested = True
         
         if self.quit_requested:
             return -10, True, self.score, True  # reward, game_over, score, user_quit
         
         # 2. Move
         self._move(action)  # Update the head
-        self.snake.insert(0, self.head)
+        self.snake.appendleft(self.head)
+        if self._in_bounds(self.head):
+            self._occupy(self._cell(self.head))
         
         # 3. Check if game over
         reward = 0
@@ -97,13 +139,18 @@ class SnakeGame:
         if self.head == self.food:
             self.score += 1
             reward = 10
-            self._place_food()
+            if not self._place_food():
+                # The snake fills the whole board: the game is won
+                return reward, True, self.score, False
         else:
-            self.snake.pop()
+            tail = self.snake.pop()
+            if self._in_bounds(tail):  # start segments can lie off a narrow board
+                self._vacate(self._cell(tail))
         
-        # 5. Update ui and clock
-        self._update_ui(game_num, record, mean_score)
-        self.clock.tick(SPEED)
+        # 5. Update ui and clock (only when a window is attached and shown)
+        if rendering:
+            self.renderer.draw(self, game_num, record, mean_score)
+            self.renderer.tick()
         
         # 6. Return game over and score
         return reward, game_over, self.score, False
@@ -114,51 +161,16 @@ class SnakeGame:
         # Hits boundary
         if pt.x > self.w - BLOCK_SIZE or pt.x < 0 or pt.y > self.h - BLOCK_SIZE or pt.y < 0:
             return True
-        # Hits itself
-        if pt in self.snake[1:]:
-            return True
-        
-        return False
+        # Hits itself (any segment but the head, i.e. self.snake[1:])
+        count = self.occupancy[self._cell(pt)]
+        if pt == self.head:
+            count -= 1
+        return count > 0
     
-    def _update_ui(self, game_num=0, record=0, mean_score=0.0):
-        self.display.fill(BLACK)
-        
-        for pt in self.snake:
-            pygame.draw.rect(self.display, GREEN1, pygame.Rect(pt.x, pt.y, BLOCK_SIZE, BLOCK_SIZE))
-            pygame.draw.rect(self.display, GREEN2, pygame.Rect(pt.x+4, pt.y+4, 12, 12))
-        
-        pygame.draw.rect(self.display, RED, pygame.Rect(self.food.x, self.food.y, BLOCK_SIZE, BLOCK_SIZE))
-        
-        # Display multiple lines of information
-        font = pygame.font.SysFont('arial', 20)
-        font_small = pygame.font.SysFont('arial', 16)
-        
-        score_text = font.render(f"Score: {self.score}", True, WHITE)
-        length_text = font_small.render(f"Length: {len(self.snake)}", True, WHITE)
-        
-        self.display.blit(score_text, [10, 5])
-        self.display.blit(length_text, [10, 30])
-        
-        if game_num > 0:
-            game_text = font_small.render(f"Game: {game_num}", True, WHITE)
-            record_text = font_small.render(f"Record: {record}", True, (255, 215, 0))  # Gold color
-            mean_text = font_small.render(f"Mean: {mean_score:.1f}", True, WHITE)
-            
-            self.display.blit(game_text, [10, 50])
-            self.display.blit(record_text, [10, 70])
-            self.display.blit(mean_text, [10, 90])
-        
-        # Quit button (top-right, always visible)
-        btn_w, btn_h = 80, 32
-        margin = 10
-        self.quit_button_rect = pygame.Rect(self.w - btn_w - margin, margin, btn_w, btn_h)
-        pygame.draw.rect(self.display, (180, 50, 50), self.quit_button_rect)
-        pygame.draw.rect(self.display, WHITE, self.quit_button_rect, 2)
-        quit_label = font_small.render("Quit", True, WHITE)
-        label_rect = quit_label.get_rect(center=self.quit_button_rect.center)
-        self.display.blit(quit_label, label_rect)
-        
-        pygame.display.flip()
+    def close(self):
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
     
     def _move(self, action):
         # [straight, right turn, left turn]
@@ -190,3 +202,75 @@ class SnakeGame:
             
         self.head = Point(x, y)
 
+class GameRenderer:
+    """Pygame window for a SnakeGame. pygame is imported here, not at module load."""
+    def __init__(self, w, h, speed=SPEED):
+        import pygame
+        pygame.init()
+        self.pygame = pygame
+        self.w = w
+        self.h = h
+        self.speed = speed
+        # Initialize display (visible window size in pixels)
+        self.display = pygame.display.set_mode((self.w, self.h))
+        pygame.display.set_caption('Snake RL - Click Quit to stop')
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont('arial', 20)
+        self.font_small = pygame.font.SysFont('arial', 16)
+        btn_w, btn_h = 80, 32
+        margin = 10
+        self.quit_button_rect = pygame.Rect(self.w - btn_w - margin, margin, btn_w, btn_h)
+    
+    def poll_quit(self):
+        """Pump window events; return True if the user asked to quit"""
+        pygame = self.pygame
+        quit_requested = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                quit_requested = True
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if self.quit_button_rect.collidepoint(event.pos):
+                    quit_requested = True
+        return quit_requested
+    
+    def draw(self, game, game_num=0, record=0, mean_score=0.0):
+        pygame = self.pygame
+        self.display.fill(BLACK)
+        
+        for pt in game.snake:
+            pygame.draw.rect(self.display, GREEN1, pygame.Rect(pt.x, pt.y, BLOCK_SIZE, BLOCK_SIZE))
+            pygame.draw.rect(self.display, GREEN2, pygame.Rect(pt.x+4, pt.y+4, 12, 12))
+        
+        if game.food is not None:
+            pygame.draw.rect(self.display, RED, pygame.Rect(game.food.x, game.food.y, BLOCK_SIZE, BLOCK_SIZE))
+        
+        # Display multiple lines of information
+        score_text = self.font.render(f"Score: {game.score}", True, WHITE)
+        length_text = self.font_small.render(f"Length: {len(game.snake)}", True, WHITE)
+        
+        self.display.blit(score_text, [10, 5])
+        self.display.blit(length_text, [10, 30])
+        
+        if game_num > 0:
+            game_text = self.font_small.render(f"Game: {game_num}", True, WHITE)
+            record_text = self.font_small.render(f"Record: {record}", True, (255, 215, 0))  # Gold color
+            mean_text = self.font_small.render(f"Mean: {mean_score:.1f}", True, WHITE)
+            
+            self.display.blit(game_text, [10, 50])
+            self.display.blit(record_text, [10, 70])
+            self.display.blit(mean_text, [10, 90])
+        
+        # Quit button (top-right, always visible)
+        pygame.draw.rect(self.display, (180, 50, 50), self.quit_button_rect)
+        pygame.draw.rect(self.display, WHITE, self.quit_button_rect, 2)
+        quit_label = self.font_small.render("Quit", True, WHITE)
+        label_rect = quit_label.get_rect(center=self.quit_button_rect.center)
+        self.display.blit(quit_label, label_rect)
+        
+        pygame.display.flip()
+    
+    def tick(self):
+        self.clock.tick(self.speed)
+    
+    def close(self):
+        self.pygame.quit()
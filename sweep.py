@@ -0,0 +1,192 @@
+"""Hyperparameter sweeps: many seeded, headless train() runs in parallel.
+
+A spec is a JSON file naming train() keyword arguments to vary, either as a
+full grid or as random samples:
+
+    {"grid": {"lr": [0.001, 0.0005], "gamma": [0.9, 0.95]},
+     "fixed": {"batch_size": 64}, "seeds": [0, 1]}
+
+    {"random": {"lr": {"log_uniform": [1e-4, 1e-2]},
+                "epsilon_decay": {"uniform": [0.5, 2.0]},
+                "hidden_size": [128, 256, 512]},
+     "trials": 64, "seeds": [0]}
+
+Every parameter set runs once per seed. Each trial trains in its own
+process on one thread, from scratch, in its own model directory
+(out/trial_0007, with its console output in train.log; emptied first if an
+earlier sweep used it), within a games and/or seconds budget. A trial
+whose mean score over the last WINDOW games is still below --prune-below
+after --prune-after games is stopped early. One row per trial is appended
+to out/summary.csv as trials finish.
+
+    python sweep.py spec.json --out sweeps/lr --max-games 300 --workers 64
+"""
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import inspect
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import time
+import traceback
+
+from core import worker_context
+from train import train
+
+# Constants
+WINDOW = 50  # games in the running mean used for pruning and ranking
+MAX_GAMES = 500
+# train() arguments the sweep sets itself
+RESERVED = {'render', 'render_every', 'dashboard', 'model_dir', 'seed', 'max_games',
+            'max_seconds', 'should_stop', 'resume', 'num_threads', 'save_checkpoints',
+            'persist_memory', 'load_model'}
+
+def grid_trials(space):
+    """Every combination of the value lists in space"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+def random_trials(space, trials, seed=0):
+    """trials parameter sets drawn from space: a list is a choice, otherwise
+    {"uniform": [lo, hi]}, {"log_uniform": [lo, hi]} or {"int": [lo, hi]}"""
+    rng = random.Random(seed)
+    def draw(dist):
+        if isinstance(dist, list):
+            return rng.choice(dist)
+        (kind, (lo, hi)), = dist.items()
+        if kind == 'uniform':
+            return rng.uniform(lo, hi)
+        if kind == 'log_uniform':
+            return math.exp(rng.uniform(math.log(lo), math.log(hi)))
+        if kind == 'int':
+            return rng.randint(lo, hi)
+        raise ValueError(f"unknown distribution {kind!r}")
+    return [{name: draw(dist) for name, dist in space.items()} for _ in range(trials)]
+
+def expand_spec(spec):
+    """The list of trials (train() keyword arguments plus 'seed') in spec"""
+    if ('grid' in spec) == ('random' in spec):
+        raise ValueError("a spec needs exactly one of 'grid' and 'random'")
+    if 'grid' in spec:
+        params = grid_trials(spec['grid'])
+    else:
+        params = random_trials(spec['random'], spec.get('trials', 16), spec.get('sample_seed', 0))
+    fixed = spec.get('fixed', {})
+    allowed = set(inspect.signature(train).parameters) - RESERVED
+    for name in itertools.chain(fixed, params[0] if params else ()):
+        if name not in allowed:
+            raise ValueError(f"{name!r} is not a train() argument a sweep can set")
+    return [{**fixed, **p, 'seed': seed} for p in params for seed in spec.get('seeds', [0])]
+
+class Pruner:
+    """should_stop for train(): True once the mean of the last window scores
+    is below below, checked from game after onwards"""
+    def __init__(self, after=None, below=None, window=WINDOW):
+        self.after = after
+        self.below = below
+        self.scores = collections.deque(maxlen=window)
+        self.pruned = False
+
+    def __call__(self, n_games, score, mean_score, record):
+        self.scores.append(score)
+        if self.after is not None and n_games >= self.after and self.recent_mean() < self.below:
+            self.pruned = True
+        return self.pruned
+
+    def recent_mean(self):
+        return sum(self.scores) / max(1, len(self.scores))
+
+def run_trial(index, params, out, max_games, max_seconds, prune_after, prune_below, threads):
+    """Train one trial headlessly; returns its summary row"""
+    model_dir = os.path.join(out, f'trial_{index:04d}')
+    # Every trial starts fresh: drop what an earlier sweep left in this directory
+    shutil.rmtree(model_dir, ignore_errors=True)
+    os.makedirs(model_dir)
+    pruner = Pruner(prune_after, prune_below)
+    row = {'trial': index, **params}
+    try:
+        with open(os.path.join(model_dir, 'train.log'), 'w') as log, contextlib.redirect_stdout(log):
+            stats = train(render=False, dashboard='none', model_dir=model_dir,
+                          save_checkpoints=False, persist_memory=False, num_threads=threads,
+                          max_games=max_games, max_seconds=max_seconds,
+                          load_model=False, should_stop=pruner, **params)
+    except Exception:
+        with open(os.path.join(model_dir, 'error.log'), 'w') as f:
+            f.write(traceback.format_exc())
+        return {**row, 'status': 'failed'}
+    if pruner.pruned:
+        status = 'pruned'
+    elif max_seconds is not None and stats['seconds'] >= max_seconds:
+        status = 'time_budget'
+    else:
+        status = 'done'
+    return {**row, 'status': status, 'recent_mean': pruner.recent_mean(),
+            **{k: stats[k] for k in ('games', 'record', 'mean_score', 'steps', 'seconds',
+                                     'steps_per_sec')}}
+
+def sweep(trials, out, workers=None, max_games=MAX_GAMES, max_seconds=None,
+          prune_after=None, prune_below=None, threads=1):
+    """Run trials (see expand_spec) on a pool of workers processes (default:
+    one per core); returns the summary rows, best recent mean first"""
+    os.makedirs(out, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    columns = ['trial', 'status', 'seed', *sorted({k for t in trials for k in t} - {'seed'}),
+               'recent_mean', 'mean_score', 'record', 'games', 'steps', 'seconds', 'steps_per_sec']
+    rows = []
+    start = time.perf_counter()
+    # Workers fork from a server that has already imported train (and torch)
+    ctx = worker_context(preload=['train'])
+    with open(os.path.join(out, 'summary.csv'), 'w', newline='') as f, \
+            concurrent.futures.ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        futures = [pool.submit(run_trial, i, params, out, max_games, max_seconds,
+                               prune_after, prune_below, threads)
+                   for i, params in enumerate(trials)]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                row = future.result()
+                rows.append(row)
+                writer.writerow(row)
+                f.flush()
+                print(f"[{len(rows)}/{len(trials)} {time.perf_counter() - start:7.1f}s] "
+                      f"trial {row['trial']:4d} {row['status']:11s} "
+                      f"recent mean {row.get('recent_mean', float('nan')):6.2f}")
+        except KeyboardInterrupt:
+            print("Sweep interrupted; cancelling the remaining trials")
+            pool.shutdown(cancel_futures=True)
+    return sorted(rows, key=lambda r: -r.get('recent_mean', -1))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a hyperparameter sweep of train()')
+    parser.add_argument('spec', help='JSON sweep spec (see sweep.py)')
+    parser.add_argument('--out', default='./sweeps/latest', metavar='DIR',
+                        help='directory for trial model dirs and summary.csv')
+    parser.add_argument('--workers', type=int, default=None, metavar='N',
+                        help='trials run at once (default: one per core)')
+    parser.add_argument('--threads', type=int, default=1, metavar='N',
+                        help='PyTorch threads per trial (default: 1)')
+    parser.add_argument('--max-games', type=int, default=MAX_GAMES, metavar='N',
+                        help=f'games per trial (default: {MAX_GAMES})')
+    parser.add_argument('--max-seconds', type=float, default=None, metavar='S',
+                        help='seconds per trial')
+    parser.add_argument('--prune-after', type=int, default=None, metavar='N',
+                        help='from this game on, stop trials whose recent mean is below --prune-below')
+    parser.add_argument('--prune-below', type=float, default=1.0, metavar='SCORE')
+    args = parser.parse_args()
+    with open(args.spec) as f:
+        trials = expand_spec(json.load(f))
+    print(f"{len(trials)} trials, {args.workers or os.cpu_count()} workers, results in {args.out}")
+    rows = sweep(trials, args.out, workers=args.workers, max_games=args.max_games,
+                 max_seconds=args.max_seconds, prune_after=args.prune_after,
+                 prune_below=args.prune_below, threads=args.threads)
+    print("Best trials:")
+    for row in rows[:5]:
+        params = {k: v for k, v in row.items() if k in trials[row['trial']]}
+        print(f"  trial {row['trial']:4d} recent mean {row.get('recent_mean', float('nan')):6.2f} {params}")
@@ -1,69 +1,236 @@
 from snake_game import SnakeGame
-from dqn_agent import Agent
-from visualizer import TrainingVisualizer
+from dqn_agent import (Agent, TRAIN_EVERY, UPDATES_PER_STEP, TRAIN_BATCH_SIZE, TARGET_UPDATE, TAU,
+                       FORWARD_MODE, FORWARD_MODES, MAX_MEMORY, LR, GAMMA, HIDDEN_SIZE,
+                       EPSILON_START, EPSILON_DECAY)
+from qtable import QTABLE_EVERY
+from metrics import MetricsLog
+from recording import EpisodeRecorder
+from checkpoint import CheckpointManager, CHECKPOINT_EVERY_SECONDS, KEEP_CHECKPOINTS
+from profiling import PhaseProfiler, format_report
+import argparse
 import numpy as np
 import os
+import random
+import time
+import torch
 
-def train():
+def train(render=True, render_every=1, prioritized=False, dashboard=None, model_dir='./model',
+          log_metrics=True, save_checkpoints=True, checkpoint_every_games=None,
+          checkpoint_every_seconds=CHECKPOINT_EVERY_SECONDS, keep_checkpoints=KEEP_CHECKPOINTS,
+          resume=False, persist_memory=True, max_games=None, seed=None, profile_every=None,
+          train_every=TRAIN_EVERY, updates_per_step=UPDATES_PER_STEP,
+          batch_size=TRAIN_BATCH_SIZE, target_update=TARGET_UPDATE, tau=TAU, double=False,
+          num_threads=None, forward_mode=FORWARD_MODE, gamma=GAMMA, lr=LR,
+          hidden_size=HIDDEN_SIZE, max_memory=MAX_MEMORY, epsilon_start=EPSILON_START,
+          epsilon_decay=EPSILON_DECAY, max_seconds=None, should_stop=None, packed_replay=False,
+          qtable_every=QTABLE_EVERY, record_episodes=True, load_model=True):
+    """Run the training loop.
+
+    render=False trains without the game window at full CPU speed. With
+    render=True, render_every=N draws only every Nth game. prioritized=True
+    samples replay batches by TD error.
+
+    Every train_every moves the agent takes updates_per_step * train_every
+    gradient steps on batch_size replayed transitions. train_every=0 uses
+    the original schedule instead: one single-sample step per move plus a
+    BATCH_SIZE batch per game. target_update, tau and double configure the
+    target network and Double DQN (see QTrainer).
+
+    num_threads pins the number of threads PyTorch uses in this process
+    (None keeps PyTorch's default). forward_mode picks how the Q-network is
+    run for acting and training (see compile_forward). gamma, lr,
+    hidden_size, max_memory, epsilon_start and epsilon_decay set the agent's
+    hyperparameters (see Agent).
+
+    dashboard picks where the training dashboard runs: 'process' (its own
+    process, the default when rendering), 'serve' (no window; attach one
+    later with `python dashboard.py`), 'inline' (on the training thread)
+    or 'none' (the default when headless).
+
+    Everything training writes lives in model_dir: the best model
+    (model.pth), the per-game metrics log (metrics.bin, see metrics.py; off
+    with log_metrics=False), checkpoints of the full training state
+    (checkpoints/, off with save_checkpoints=False) and the memory-mapped
+    replay memory (replay/; persist_memory=False keeps it in RAM only), so
+    a restarted run starts with a full memory. A model.pth already in
+    model_dir is loaded unless load_model=False or its layer sizes differ.
+    packed_replay=True stores each transition in 6 bytes instead of 101
+    (see ReplayBuffer).
+    qtable_every=K serves greedy actions from a table of every state's
+    Q-values, rebuilt every K optimizer steps, and writes it next to the
+    model on every record (qtable.npz, see qtable.py).
+    record_episodes=True appends every game, as its seed and moves, to
+    episodes.bin (see recording.py); watch them with replay.py.
+
+    Checkpoints are written in the background every checkpoint_every_games
+    games and/or checkpoint_every_seconds seconds and when training stops,
+    keeping the newest keep_checkpoints. resume=True continues from the
+    latest one.
+
+    max_games stops after that many games and max_seconds after the first
+    game to end past that many seconds; should_stop(n_games, score,
+    mean_score, record), if given, is called after every game and stops
+    training when it returns True. seed makes the run reproducible.
+    profile_every=N times every phase of the loop and reports per-phase
+    timings and steps/updates/samples per second every N games, to the
+    console and next to the metrics log. Returns the run's statistics.
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+    if num_threads:
+        torch.set_num_threads(num_threads)
     total_score = 0
     record = 0
-    agent = Agent()
-    game = SnakeGame()
-    visualizer = TrainingVisualizer()
+    agent = Agent(prioritized=prioritized, seed=seed, train_every=train_every,
+                  updates_per_step=updates_per_step, batch_size=batch_size,
+                  target_update=target_update, tau=tau, double=double, forward_mode=forward_mode,
+                  gamma=gamma, lr=lr, hidden_size=hidden_size, max_memory=max_memory,
+                  epsilon_start=epsilon_start, epsilon_decay=epsilon_decay,
+                  packed_memory=packed_replay, qtable_every=qtable_every,
+                  memory_path=os.path.join(model_dir, 'replay') if persist_memory else None)
+    if len(agent.memory):
+        print(f"Reopened replay memory with {len(agent.memory)} transitions")
+    game = SnakeGame(render=render, seed=seed)
+    metrics = MetricsLog(os.path.join(model_dir, 'metrics.bin')) if log_metrics else None
+    recorder = None
+    if record_episodes:
+        recorder = EpisodeRecorder(os.path.join(model_dir, 'episodes.bin'), game.w, game.h)
+    checkpoints = None
+    if save_checkpoints:
+        checkpoints = CheckpointManager(os.path.join(model_dir, 'checkpoints'),
+                                        checkpoint_every_games, checkpoint_every_seconds,
+                                        keep_checkpoints)
+    if dashboard is None:
+        dashboard = 'process' if render else 'none'
+    visualizer = None
+    # Imported lazily so headless runs never load matplotlib's GUI backend
+    if dashboard == 'inline':
+        from visualizer import TrainingVisualizer
+        visualizer = TrainingVisualizer()
+    elif dashboard in ('process', 'serve'):
+        from dashboard import DashboardServer
+        visualizer = DashboardServer()
+        if dashboard == 'process':
+            visualizer.spawn_viewer()
+        host, port = visualizer.address
+        print(f"Dashboard server on {host}:{port} (attach with: python dashboard.py "
+              f"--port {port} --authkey {visualizer.authkey.decode()})")
     
-    # Try to load existing model
-    if agent.model.load():
+    # Resume the full training state, or try to load an existing model
+    resumed = None
+    if resume and checkpoints is not None:
+        resumed = checkpoints.restore(agent)
+        if resumed is None:
+            print(f"No checkpoint in {checkpoints.folder}, starting fresh")
+    if resumed is not None:
+        record = resumed['record']
+        total_score = resumed['total_score']
+        # Replay the game that was about to start: its seed is already drawn
+        game.rng.setstate(resumed['game_rng'])
+        game.reset(episode_seed=resumed.get('episode_seed'))
+        print(f"Resumed from {checkpoints.latest()} at game {agent.n_games}")
+    elif load_model and agent.model.load(model_folder_path=model_dir):
         print("Loaded existing model")
     
     print("=" * 60)
     print("Snake RL Training Started")
     print("=" * 60)
-    print("Click the Quit button in the game window, or press Ctrl+C to stop")
-    print("=" * 60)
-    print("\nInitializing visualization...")
-    print("You should see:")
-    print("  1. A Pygame window titled 'Snake RL' (the game)")
-    print("  2. A Matplotlib window titled 'Snake RL Training Dashboard'")
-    print("\nIf windows don't appear, check TROUBLESHOOTING.md")
+    if render:
+        print("Click the Quit button in the game window, or press Ctrl+C to stop")
+        print("=" * 60)
+        print("\nInitializing visualization...")
+        print("You should see:")
+        print("  1. A Pygame window titled 'Snake RL' (the game)")
+        if dashboard in ('inline', 'process'):
+            print("  2. A Matplotlib window titled 'Snake RL Training Dashboard'")
+        print("\nIf windows don't appear, check TROUBLESHOOTING.md")
+    else:
+        print("Running headless - press Ctrl+C to stop")
     print("=" * 60)
     
-    # Show initial empty visualization
-    visualizer.update(0, 0, 0.0, 0, 80, 0)
-    print("\nDashboard initialized! Waiting for first game to complete...")
-    print("(The dashboard will update after each game ends)\n")
+    if visualizer is not None:
+        # Show initial empty visualization
+        visualizer.update(0, 0, 0.0, 0, agent.exploration(), 0)
+        print("\nDashboard initialized! Waiting for first game to complete...")
+        print("(The dashboard will update after each game ends)\n")
     
+    start_games = agent.n_games
+    steps = 0
+    start = time.perf_counter()
+    profiler = None
+    if profile_every:
+        profiler = agent.profiler = PhaseProfiler()
+    if recorder is not None:
+        recorder.begin(game.episode_seed)
     try:
         mean_score = 0.0
-        while True:
+        while max_games is None or agent.n_games - start_games < max_games:
             # Get old state
             state_old = agent.get_state(game)
+            if profiler is not None:
+                profiler.lap('get_state')
             
             # Get move
             final_move = agent.get_action(state_old)
+            if profiler is not None:
+                profiler.lap('get_action')
             
             # Perform move and get new state (pass stats for display)
             reward, done, score, user_quit = game.play_step(final_move, agent.n_games, record, mean_score)
+            if profiler is not None:
+                profiler.lap('play_step')
             state_new = agent.get_state(game)
+            steps += 1
+            if profiler is not None:
+                profiler.lap('get_state')
             
             if user_quit:
                 print("\nQuit button pressed. Stopping training...")
                 break
             
-            # Train short memory
-            agent.train_short_memory(state_old, final_move, reward, state_new, done)
+            # Train short memory (only on the legacy schedule)
+            if not agent.train_every:
+                agent.train_short_memory(state_old, final_move, reward, state_new, done)
+                if profiler is not None:
+                    profiler.lap('train_short_memory')
             
             # Remember
             agent.remember(state_old, final_move, reward, state_new, done)
+            if recorder is not None:
+                recorder.step(final_move.index(1), reward)
+            if profiler is not None:
+                profiler.lap('remember')
+            
+            # Mini-batch updates at a fixed ratio to moves
+            if agent.train_every:
+                agent.train_on_schedule()
+                if profiler is not None:
+                    profiler.lap('train_on_schedule')
             
             if done:
                 # Train long memory, update visualization
                 game.reset()
                 agent.n_games += 1
-                agent.train_long_memory()
+                if recorder is not None:
+                    recorder.end(agent.n_games, score, record=score > record)
+                    recorder.begin(game.episode_seed)
+                if profiler is not None:
+                    profiler.lap('reset')
+                if not agent.train_every:
+                    agent.train_long_memory()
+                    if profiler is not None:
+                        profiler.lap('train_long_memory')
+                # Only draw every render_every-th game
+                game.render_enabled = render and agent.n_games % render_every == 0
                 
                 if score > record:
                     record = score
-                    agent.model.save()
+                    agent.model.save(model_folder_path=model_dir)
+                    if agent.qtable is not None:
+                        agent.qtable.refresh(agent.trainer.updates)
+                        agent.qtable.save(os.path.join(model_dir, 'qtable.npz'))
                     print(f'🎉 NEW RECORD! Score: {score} - Model saved!')
                 
                 # Calculate statistics
@@ -71,15 +238,46 @@ def train():
                 mean_score = total_score / agent.n_games
                 
                 # Get epsilon and memory size for display
-                epsilon = max(0, 80 - agent.n_games)
+                epsilon = agent.exploration()
                 memory_size = len(agent.memory)
                 
+                agent.memory.flush()
+                if metrics is not None:
+                    metrics.append(agent.n_games, score, mean_score, record, epsilon, memory_size)
+                
+                if profiler is not None:
+                    profiler.lap('bookkeeping')
+                
                 # Update visualization
-                visualizer.update(agent.n_games, score, mean_score, record, epsilon, memory_size)
+                if visualizer is not None:
+                    visualizer.update(agent.n_games, score, mean_score, record, epsilon, memory_size)
+                    if profiler is not None:
+                        profiler.lap('visualizer')
                 
                 # Console output
                 print(f'Game {agent.n_games:4d} | Score: {score:3d} | Mean: {mean_score:5.2f} | Record: {record:3d} | ε: {epsilon:5.1f} | Memory: {memory_size:6d}')
                 
+                if checkpoints is not None:
+                    checkpoints.maybe_save(agent, record=record, total_score=total_score,
+                                           game_rng=game.rng.getstate(),
+                                           episode_seed=game.episode_seed)
+                if profiler is not None:
+                    profiler.lap('bookkeeping')
+                
+                if profiler is not None and (agent.n_games - start_games) % profile_every == 0:
+                    counters = dict(steps=steps, gradient_steps=agent.trainer.updates,
+                                    samples=agent.trainer.samples)
+                    report = profiler.report(**counters)
+                    print(format_report(report))
+                    if metrics is not None:
+                        metrics.write_profile(agent.n_games, report)
+                    profiler.reset(**counters)
+                
+                if max_seconds is not None and time.perf_counter() - start >= max_seconds:
+                    break
+                if should_stop is not None and should_stop(agent.n_games, score, mean_score, record):
+                    break
+                
     except KeyboardInterrupt:
         print("\n" + "=" * 60)
         print("Training stopped by user (Ctrl+C)")
@@ -90,10 +288,130 @@ def train():
         print(f"  Record Score: {record}")
         print(f"  Mean Score: {total_score / max(1, agent.n_games):.2f}")
         print("=" * 60)
-        visualizer.close()
-        import pygame
-        pygame.quit()
+        if checkpoints is not None:
+            checkpoints.save(agent, record=record, total_score=total_score,
+                             game_rng=game.rng.getstate(), episode_seed=game.episode_seed)
+            checkpoints.wait()
+            print(f"Checkpoint saved to {checkpoints.latest()}")
+        agent.memory.close()
+        if metrics is not None:
+            metrics.close()
+        if recorder is not None:
+            recorder.close()
+        if visualizer is not None:
+            visualizer.close()
+        game.close()
+    
+    elapsed = time.perf_counter() - start
+    return {'games': agent.n_games - start_games, 'record': record,
+            'mean_score': total_score / max(1, agent.n_games), 'steps': steps,
+            'seconds': elapsed, 'steps_per_sec': steps / max(elapsed, 1e-9),
+            'games_per_sec': (agent.n_games - start_games) / max(elapsed, 1e-9)}
 
 if __name__ == '__main__':
-    train()
-
+    parser = argparse.ArgumentParser(description='Train the Snake DQN agent')
+    parser.add_argument('--headless', action='store_true',
+                        help='train without the game window and dashboard (no display needed)')
+    parser.add_argument('--dashboard', choices=['process', 'serve', 'inline', 'none'],
+                        help='where the dashboard runs (default: process, or none with --headless)')
+    parser.add_argument('--model-dir', default='./model', metavar='DIR',
+                        help='where the model, metrics log, checkpoints and replay memory live '
+                             '(default: ./model)')
+    parser.add_argument('--max-games', type=int, default=None, metavar='N',
+                        help='stop after N games')
+    parser.add_argument('--seed', type=int, default=None, help='seed all random number generators')
+    parser.add_argument('--train-every', type=int, default=TRAIN_EVERY, metavar='N',
+                        help=f'train every N moves (default: {TRAIN_EVERY}); 0 = one single-sample '
+                             'step per move plus one big batch per game')
+    parser.add_argument('--updates-per-step', type=float, default=UPDATES_PER_STEP, metavar='R',
+                        help=f'gradient steps per move (default: {UPDATES_PER_STEP})')
+    parser.add_argument('--batch-size', type=int, default=TRAIN_BATCH_SIZE, metavar='N',
+                        help=f'transitions per gradient step (default: {TRAIN_BATCH_SIZE})')
+    parser.add_argument('--target-update', type=int, default=TARGET_UPDATE, metavar='N',
+                        help='bootstrap from a target network copied from the model every N '
+                             'gradient steps')
+    parser.add_argument('--tau', type=float, default=TAU,
+                        help='bootstrap from a target network moved towards the model by TAU '
+                             'after every gradient step (Polyak)')
+    parser.add_argument('--double', action='store_true',
+                        help='Double DQN targets (needs --target-update or --tau)')
+    parser.add_argument('--gamma', type=float, default=GAMMA, help=f'discount rate (default: {GAMMA})')
+    parser.add_argument('--lr', type=float, default=LR, help=f'learning rate (default: {LR})')
+    parser.add_argument('--hidden-size', type=int, default=HIDDEN_SIZE, metavar='N',
+                        help=f'units per hidden layer (default: {HIDDEN_SIZE})')
+    parser.add_argument('--max-memory', type=int, default=MAX_MEMORY, metavar='N',
+                        help=f'replay memory capacity (default: {MAX_MEMORY})')
+    parser.add_argument('--epsilon-start', type=float, default=EPSILON_START, metavar='E',
+                        help=f'initial exploration, out of 200 (default: {EPSILON_START})')
+    parser.add_argument('--epsilon-decay', type=float, default=EPSILON_DECAY, metavar='D',
+                        help=f'exploration drop per game (default: {EPSILON_DECAY})')
+    parser.add_argument('--max-seconds', type=float, default=None, metavar='S',
+                        help='stop after this many seconds')
+    parser.add_argument('--threads', type=int, default=None, metavar='N',
+                        help='threads PyTorch may use (default: PyTorch decides)')
+    parser.add_argument('--forward', choices=FORWARD_MODES, default=FORWARD_MODE,
+                        help=f'how the Q-network runs (default: {FORWARD_MODE})')
+    parser.add_argument('--profile', type=int, default=None, metavar='N',
+                        help='time each phase of the training loop and report every N games')
+    parser.add_argument('--no-metrics', action='store_true', help='do not write the metrics log')
+    parser.add_argument('--no-recording', action='store_true',
+                        help='do not record games for replay.py')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the latest checkpoint (weights, optimizer, memory, RNGs)')
+    parser.add_argument('--checkpoint-every-games', type=int, default=None, metavar='N',
+                        help='checkpoint every N games')
+    parser.add_argument('--checkpoint-every-seconds', type=float, default=CHECKPOINT_EVERY_SECONDS,
+                        metavar='S', help=f'checkpoint every S seconds (default: {CHECKPOINT_EVERY_SECONDS})')
+    parser.add_argument('--keep-checkpoints', type=int, default=KEEP_CHECKPOINTS, metavar='N',
+                        help=f'number of checkpoints to keep (default: {KEEP_CHECKPOINTS})')
+    parser.add_argument('--no-checkpoints', action='store_true', help='do not write checkpoints')
+    parser.add_argument('--in-memory-replay', action='store_true',
+                        help='keep the replay memory in RAM only (not kept across restarts)')
+    parser.add_argument('--packed-replay', action='store_true',
+                        help='bit-pack the replay memory (6 bytes per transition instead of 101)')
+    parser.add_argument('--qtable-every', type=int, default=QTABLE_EVERY, metavar='K',
+                        help='act from a Q-value table of every state, rebuilt every K '
+                             'optimizer steps (default: off)')
+    parser.add_argument('--render-every', type=int, default=1, metavar='N',
+                        help='only draw every Nth game (default: 1)')
+    parser.add_argument('--prioritized', action='store_true',
+                        help='sample every replay update by TD error (prioritized experience replay)')
+    parser.add_argument('--actors', type=int, default=0, metavar='N',
+                        help='headless distributed mode: N actor processes feed one learner')
+    args = parser.parse_args()
+    if args.actors > 0:
+        # The learner trains continuously and only saves the best model
+        train_only = ('dashboard', 'render_every', 'train_every', 'updates_per_step', 'batch_size',
+                      'profile', 'no_metrics', 'no_recording', 'resume', 'checkpoint_every_games',
+                      'checkpoint_every_seconds', 'keep_checkpoints', 'no_checkpoints',
+                      'in_memory_replay', 'qtable_every')
+        unsupported = ['--' + dest.replace('_', '-') for dest in train_only
+                       if getattr(args, dest) != parser.get_default(dest)]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be used with --actors")
+        from distributed import train_distributed
+        train_distributed(num_actors=args.actors, prioritized=args.prioritized,
+                          num_threads=args.threads, forward_mode=args.forward,
+                          packed_memory=args.packed_replay, model_dir=args.model_dir,
+                          max_games=args.max_games, max_seconds=args.max_seconds, seed=args.seed,
+                          gamma=args.gamma, lr=args.lr, hidden_size=args.hidden_size,
+                          max_memory=args.max_memory, epsilon_start=args.epsilon_start,
+                          epsilon_decay=args.epsilon_decay, target_update=args.target_update,
+                          tau=args.tau, double=args.double)
+    else:
+        train(render=not args.headless, render_every=max(1, args.render_every),
+              prioritized=args.prioritized, dashboard=args.dashboard,
+              model_dir=args.model_dir, log_metrics=not args.no_metrics,
+              save_checkpoints=not args.no_checkpoints,
+              checkpoint_every_games=args.checkpoint_every_games,
+              checkpoint_every_seconds=args.checkpoint_every_seconds,
+              keep_checkpoints=max(1, args.keep_checkpoints), resume=args.resume,
+              persist_memory=not args.in_memory_replay, max_games=args.max_games, seed=args.seed,
+              profile_every=args.profile, train_every=max(0, args.train_every),
+              updates_per_step=args.updates_per_step, batch_size=args.batch_size,
+              target_update=args.target_update, tau=args.tau, double=args.double,
+              num_threads=args.threads, forward_mode=args.forward, gamma=args.gamma,
+              lr=args.lr, hidden_size=args.hidden_size, max_memory=args.max_memory,
+              epsilon_start=args.epsilon_start, epsilon_decay=args.epsilon_decay,
+              max_seconds=args.max_seconds, packed_replay=args.packed_replay,
+              qtable_every=args.qtable_every, record_episodes=not args.no_recording)
@@ -0,0 +1,170 @@
+import numpy as np
+import random
+from core import BLOCK_SIZE
+from features import DX, DY, TURNS, batch_features
+
+class VectorSnakeEnv:
+    """N Snake boards stored as NumPy arrays and stepped with one call.
+
+    Follows the same rules as SnakeGame.play_step. Board i with a given seed
+    produces exactly the same rewards, scores and states as
+    SnakeGame(w, h, render=False, seed=seed + i) driven with the same actions
+    and reset after every game over, including its episode_seeds. Finished
+    boards are reset automatically.
+    Coordinates are in grid cells, not pixels.
+    """
+    def __init__(self, num_envs, w=640, h=480, seed=None):
+        self.num_envs = num_envs
+        self.w = w
+        self.h = h
+        self.cols = w // BLOCK_SIZE
+        self.rows = h // BLOCK_SIZE
+        self.n_cells = self.cols * self.rows
+        self._start_x = (w // 2) // BLOCK_SIZE
+        self._start_y = (h // 2) // BLOCK_SIZE
+
+        # Per board: a stream of episode seeds, and the food RNG of the current game
+        self.rngs = [random.Random(None if seed is None else seed + i) for i in range(num_envs)]
+        self.food_rngs = [None] * num_envs
+        self.episode_seeds = np.zeros(num_envs, dtype=np.int64)
+        self._idx = np.arange(num_envs)
+
+        # Occupancy grid and ring-buffer body (cell ids) per board
+        self.occupied = np.zeros((num_envs, self.n_cells), dtype=bool)
+        self.body = np.zeros((num_envs, self.n_cells), dtype=np.int32)
+        self.head_ptr = np.zeros(num_envs, dtype=np.int64)
+        self.length = np.zeros(num_envs, dtype=np.int64)
+        # Free-cell lists, maintained with the same swap-remove order as SnakeGame
+        self.free = np.zeros((num_envs, self.n_cells), dtype=np.int32)
+        self.free_pos = np.zeros((num_envs, self.n_cells), dtype=np.int32)
+        self.n_free = np.zeros(num_envs, dtype=np.int64)
+
+        self.head_x = np.zeros(num_envs, dtype=np.int32)
+        self.head_y = np.zeros(num_envs, dtype=np.int32)
+        self.direction = np.zeros(num_envs, dtype=np.int32)
+        self.food = np.zeros(num_envs, dtype=np.int32)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.frame_iteration = np.zeros(num_envs, dtype=np.int64)
+
+        self._reset_boards(self._idx)
+
+    def reset(self):
+        """Reset every board and return their states"""
+        self._reset_boards(self._idx)
+        return self._observe()
+
+    def step(self, actions):
+        """Advance all boards by one move.
+
+        actions is an array of action indices (0 straight, 1 right turn,
+        2 left turn) or of one-hot rows. Returns (states, rewards, dones,
+        scores); scores are the final scores for boards that just finished,
+        whose states already belong to the freshly reset board.
+        """
+        actions = np.asarray(actions)
+        if actions.ndim == 2:
+            actions = actions.argmax(axis=1)
+
+        # 1. Move the heads
+        self.frame_iteration += 1
+        self.direction = (self.direction + TURNS[actions]) % 4
+        hx = self.head_x + DX[self.direction]
+        hy = self.head_y + DY[self.direction]
+
+        # 2. Check if game over (the tail has not moved yet, like in play_step)
+        out = (hx < 0) | (hx >= self.cols) | (hy < 0) | (hy >= self.rows)
+        cell = np.where(out, 0, hy * self.cols + hx)
+        hit = out | self.occupied[self._idx, cell]
+        dones = hit | (self.frame_iteration > 100 * (self.length + 1))
+        alive = ~dones
+        eat = alive & (cell == self.food)
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        rewards[dones] = -10
+        rewards[eat] = 10
+
+        # 3. Push the new head on surviving boards
+        a = np.flatnonzero(alive)
+        ptr = (self.head_ptr[a] + 1) % self.n_cells
+        self.head_ptr[a] = ptr
+        self.body[a, ptr] = cell[a]
+        self.occupied[a, cell[a]] = True
+        self._take_free(a, cell[a])
+        self.head_x[a] = hx[a]
+        self.head_y[a] = hy[a]
+
+        # 4. Grow or drop the tail
+        self.score[eat] += 1
+        self.length[eat] += 1
+        m = np.flatnonzero(alive & ~eat)
+        tail = self.body[m, (self.head_ptr[m] - self.length[m]) % self.n_cells]
+        on_board = tail >= 0
+        m, tail = m[on_board], tail[on_board]
+        self.occupied[m, tail] = False
+        self._add_free(m, tail)
+        for b in np.flatnonzero(eat):
+            if not self._place_food(b):
+                dones[b] = True  # board is full: the game is won
+
+        # 5. Auto-reset finished boards
+        scores = self.score.copy()
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            self._reset_boards(finished)
+
+        return self._observe(), rewards, dones, scores
+
+    def _reset_boards(self, b):
+        x0, y0 = self._start_x, self._start_y
+        self.occupied[b] = False
+        self.direction[b] = 0  # right
+        self.head_x[b] = x0
+        self.head_y[b] = y0
+        # Head first, then the two body segments to its left; segments off a
+        # narrow board are -1 and never occupy a cell, like in SnakeGame
+        xs = x0 - np.arange(3)
+        start = np.where(xs >= 0, y0 * self.cols + xs, -1).astype(np.int32)
+        self.body[b, :3] = start[::-1]  # ring buffer runs tail -> head
+        self.head_ptr[b] = 2
+        self.length[b] = 3
+        self.occupied[np.asarray(b)[:, None], start[start >= 0]] = True
+        # Free cells in ascending order, like SnakeGame._rebuild_occupancy
+        b = np.atleast_1d(b)
+        free = np.nonzero(~self.occupied[b])[1].reshape(len(b), -1)
+        self.free[b, :free.shape[1]] = free
+        self.free_pos[b] = -1
+        self.free_pos[b[:, None], free] = np.arange(free.shape[1], dtype=np.int32)
+        self.n_free[b] = free.shape[1]
+        self.score[b] = 0
+        self.frame_iteration[b] = 0
+        for i in b:
+            self.episode_seeds[i] = episode_seed = self.rngs[i].getrandbits(32)
+            self.food_rngs[i] = random.Random(episode_seed)
+            self._place_food(i)
+
+    def _take_free(self, b, cell):
+        # Swap-remove cell[k] from the free list of board b[k]
+        i = self.free_pos[b, cell]
+        last = self.n_free[b] - 1
+        moved = self.free[b, last]
+        self.free[b, i] = moved
+        self.free_pos[b, moved] = i
+        self.free_pos[b, cell] = -1
+        self.n_free[b] = last
+
+    def _add_free(self, b, cell):
+        self.free[b, self.n_free[b]] = cell
+        self.free_pos[b, cell] = self.n_free[b]
+        self.n_free[b] += 1
+
+    def _place_food(self, b):
+        n_free = int(self.n_free[b])
+        if not n_free:
+            return False
+        self.food[b] = self.free[b, self.food_rngs[b].randrange(n_free)]
+        return True
+
+    def _observe(self):
+        return batch_features(self.head_x, self.head_y, self.direction,
+                              self.food % self.cols, self.food // self.cols,
+                              self.occupied, self.cols, self.rows)
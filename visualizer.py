@@ -1,23 +1,43 @@
-import matplotlib
+import os
 import sys
-# Use macOSX backend on macOS, TkAgg on others
-if sys.platform == 'darwin':
-    matplotlib.use('macOSX')  # Native macOS backend, avoids tkinter conflicts
-else:
-    matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
+import time
+from collections import deque
 import numpy as np
-from matplotlib.patches import Rectangle
-import matplotlib.patches as mpatches
+
+plt = None  # matplotlib.pyplot, imported by the first TrainingVisualizer
+
+def _load_pyplot():
+    # matplotlib and its GUI backend are only loaded once a window is wanted
+    global plt
+    if plt is None:
+        import matplotlib
+        # Use macOSX backend on macOS, TkAgg on others (an explicit MPLBACKEND wins)
+        if 'MPLBACKEND' not in os.environ:
+            if sys.platform == 'darwin':
+                matplotlib.use('macOSX')  # Native macOS backend, avoids tkinter conflicts
+            else:
+                matplotlib.use('TkAgg')
+        import matplotlib.pyplot
+        plt = matplotlib.pyplot
+    return plt
 
 class TrainingVisualizer:
-    def __init__(self):
+    """Six-panel training dashboard.
+
+    All artists are created once; update() only records the new game and, at
+    most max_fps times per second, pushes the data into the existing artists
+    and redraws. Pass max_fps=None to redraw after every game.
+
+    The line and bar charts show the last `window` games, kept in fixed-size
+    ring buffers; the score distribution covers every game via per-score
+    counts, so memory stays bounded however long training runs.
+    """
+    def __init__(self, max_fps=2.0, window=100):
+        _load_pyplot()
         plt.ion()  # Turn on interactive mode
         self.fig = plt.figure(figsize=(16, 10))
         self.fig.suptitle('Snake RL Training Dashboard', fontsize=16, fontweight='bold')
-        plt.show(block=False)  # Show the figure immediately
-        plt.pause(0.1)  # Small pause to ensure window appears
-        
+
         # Create subplots
         self.ax1 = plt.subplot(2, 3, 1)  # Score plot
         self.ax2 = plt.subplot(2, 3, 2)  # Mean score plot
@@ -25,228 +45,291 @@ class TrainingVisualizer:
         self.ax4 = plt.subplot(2, 3, 4)  # Recent scores bar chart
         self.ax5 = plt.subplot(2, 3, 5)  # Score distribution
         self.ax6 = plt.subplot(2, 3, 6)  # Training metrics
-        
-        # Initialize data storage
-        self.scores = []
-        self.mean_scores = []
-        self.records = []
-        self.game_numbers = []
-        
+
+        # Initialize data storage (ring buffers of the last `window` games)
+        self.scores = deque(maxlen=window)
+        self.mean_scores = deque(maxlen=window)
+        self.records = deque(maxlen=window)
+        self.game_numbers = deque(maxlen=window)
+        self.score_counts = np.zeros(64, dtype=np.int64)  # all games: count per score
+
         # Statistics
         self.total_games = 0
         self.current_record = 0
         self.best_mean_score = 0
         self.total_food_eaten = 0
-        
+        self.epsilon = 0
+        self.memory_size = 0
+
+        # Redraw throttling
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self._last_draw = float('-inf')
+        self._dirty = False
+
+        self._create_artists()
+        plt.tight_layout()  # Layout is fixed from here on
+        plt.show(block=False)  # Show the figure immediately
+        plt.pause(0.1)  # Small pause to ensure window appears
+        # Bring the window to front once (platform dependent)
+        try:
+            self.fig.canvas.manager.window.raise_()
+        except Exception:
+            pass  # Some backends don't support this
+
     def update(self, game_num, score, mean_score, record, epsilon, memory_size):
-        """Update all visualizations with new data"""
+        """Record a finished game; redraw if the last redraw is old enough"""
         self.total_games = game_num
         self.current_record = record
+        self.epsilon = epsilon
+        self.memory_size = memory_size
         if mean_score > 0:
             self.best_mean_score = max(self.best_mean_score, mean_score)
         if score > 0:
             self.total_food_eaten += score
-        
+
         # Only append if we have actual game data (game_num > 0)
         if game_num > 0:
             self.scores.append(score)
             self.mean_scores.append(mean_score)
             self.records.append(record)
             self.game_numbers.append(game_num)
-        
-        # Keep only last 100 games for performance
-        if len(self.scores) > 100:
-            self.scores = self.scores[-100:]
-            self.mean_scores = self.mean_scores[-100:]
-            self.records = self.records[-100:]
-            self.game_numbers = self.game_numbers[-100:]
-        
-        # Clear all axes
-        for ax in [self.ax1, self.ax2, self.ax3, self.ax4, self.ax5, self.ax6]:
-            ax.clear()
-        
+            if score >= len(self.score_counts):
+                self.score_counts = np.concatenate(
+                    [self.score_counts, np.zeros(score + 1, dtype=np.int64)])
+            self.score_counts[score] += 1
+
+        self._dirty = True
+        self.flush()
+
+    def flush(self):
+        """Redraw if an update is pending and the last redraw is old enough"""
+        if self._dirty and time.perf_counter() - self._last_draw >= self.min_interval:
+            self.redraw()
+
+    def redraw(self):
+        """Push the latest data into the artists and draw them now"""
+        self._update_scores()
+        self._update_mean_scores()
+        self._update_statistics()
+        self._update_recent_scores()
+        self._update_score_distribution()
+        self._update_training_metrics()
+        self.fig.canvas.draw_idle()
+        self.fig.canvas.flush_events()
+        self._last_draw = time.perf_counter()
+        self._dirty = False
+
+    def _create_artists(self):
+        """Create every line, bar and text once; later updates only set their data"""
+        waiting = dict(ha='center', va='center', fontsize=12, visible=False)
+
         # 1. Score Plot
-        self._plot_scores()
-        
-        # 2. Mean Score Plot
-        self._plot_mean_scores()
-        
-        # 3. Statistics Panel
-        self._plot_statistics(epsilon, memory_size)
-        
-        # 4. Recent Scores Bar Chart
-        self._plot_recent_scores()
-        
-        # 5. Score Distribution
-        self._plot_score_distribution()
-        
-        # 6. Training Metrics
-        self._plot_training_metrics()
-        
-        plt.tight_layout()
-        plt.draw()
-        plt.pause(0.01)
-        # Force window to front (platform dependent)
-        try:
-            self.fig.canvas.manager.window.raise_()
-        except:
-            pass  # Some backends don't support this
-    
-    def _plot_scores(self):
-        """Plot individual game scores"""
-        if len(self.scores) > 0:
-            self.ax1.plot(self.game_numbers, self.scores, 'b-', alpha=0.6, linewidth=1, label='Score')
-            self.ax1.plot(self.game_numbers, self.records, 'r-', linewidth=2, label='Record')
-            self.ax1.legend()
-        else:
-            self.ax1.text(0.5, 0.5, 'Waiting for game data...', 
-                         ha='center', va='center', fontsize=12, transform=self.ax1.transAxes)
+        self.score_line, = self.ax1.plot([], [], 'b-', alpha=0.6, linewidth=1, label='Score')
+        self.record_line, = self.ax1.plot([], [], 'r-', linewidth=2, label='Record')
+        self.ax1_legend = self.ax1.legend(loc='upper left')
+        self.ax1_waiting = self.ax1.text(0.5, 0.5, 'Waiting for game data...',
+                                         transform=self.ax1.transAxes, **waiting)
         self.ax1.set_title('Game Scores', fontweight='bold')
         self.ax1.set_xlabel('Game Number')
         self.ax1.set_ylabel('Score')
         self.ax1.grid(True, alpha=0.3)
-        self.ax1.set_ylim(ymin=0)
-        
-    def _plot_mean_scores(self):
-        """Plot mean scores over time"""
-        if len(self.mean_scores) > 0:
-            self.ax2.plot(self.game_numbers, self.mean_scores, 'g-', linewidth=2, label='Mean Score')
-            if self.best_mean_score > 0:
-                self.ax2.axhline(y=self.best_mean_score, color='orange', linestyle='--', 
-                                 linewidth=2, label=f'Best Mean: {self.best_mean_score:.1f}')
-            self.ax2.legend()
-        else:
-            self.ax2.text(0.5, 0.5, 'Waiting for game data...', 
-                         ha='center', va='center', fontsize=12, transform=self.ax2.transAxes)
+
+        # 2. Mean Score Plot
+        self.mean_line, = self.ax2.plot([], [], 'g-', linewidth=2, label='Mean Score')
+        self.best_mean_line = self.ax2.axhline(y=0, color='orange', linestyle='--',
+                                               linewidth=2, label='Best Mean: 0.0', visible=False)
+        self.ax2_legend = self.ax2.legend(loc='upper left')
+        self.ax2_waiting = self.ax2.text(0.5, 0.5, 'Waiting for game data...',
+                                         transform=self.ax2.transAxes, **waiting)
         self.ax2.set_title('Mean Score Over Time', fontweight='bold')
         self.ax2.set_xlabel('Game Number')
         self.ax2.set_ylabel('Mean Score')
         self.ax2.grid(True, alpha=0.3)
-        self.ax2.set_ylim(ymin=0)
-        
-    def _plot_statistics(self, epsilon, memory_size):
-        """Display key statistics as text"""
+
+        # 3. Statistics Panel
         self.ax3.axis('off')
-        
+        self.stats_text = self.ax3.text(0.1, 0.5, '', fontsize=11, family='monospace',
+                                        verticalalignment='center', bbox=dict(boxstyle='round',
+                                        facecolor='wheat', alpha=0.5))
+        self.ax3.set_title('Live Statistics', fontweight='bold')
+
+        # 4. Recent Scores Bar Chart
+        self.recent_bars = self.ax4.bar(range(20), np.zeros(20), alpha=0.7)
+        self.recent_record_line = self.ax4.axhline(y=0, color='red', linestyle='--',
+                                                   linewidth=2, label='Record: 0')
+        self.ax4_legend = self.ax4.legend(loc='upper left')
+        self.ax4.set_title('Recent 20 Games', fontweight='bold')
+        self.ax4.set_xlabel('Recent Games')
+        self.ax4.set_ylabel('Score')
+        self.ax4.grid(True, alpha=0.3, axis='y')
+
+        # 5. Score Distribution
+        self.hist = self.ax5.stairs(np.zeros(5), np.arange(6), fill=True, color='skyblue',
+                                    edgecolor='black', alpha=0.7)
+        self.mean_vline = self.ax5.axvline(x=0, color='red', linestyle='--',
+                                           linewidth=2, label='Mean: 0.0')
+        self.median_vline = self.ax5.axvline(x=0, color='green', linestyle='--',
+                                             linewidth=2, label='Median: 0.0')
+        self.ax5_legend = self.ax5.legend(loc='upper right')
+        self.ax5_waiting = self.ax5.text(0.5, 0.5, 'Need more data\n(min 10 games)',
+                                         transform=self.ax5.transAxes, **waiting)
+        self.ax5.set_title('Score Distribution (all games)', fontweight='bold')
+        self.ax5.set_xlabel('Score')
+        self.ax5.set_ylabel('Frequency')
+        self.ax5.grid(True, alpha=0.3, axis='y')
+
+        # 6. Training Metrics
+        self.record_marks, = self.ax6.plot([], [], 'go-', markersize=8,
+                                           label='Record Broken', linewidth=0)
+        self.ax6_legend = self.ax6.legend(loc='upper right')
+        self.improvement_text = self.ax6.text(0.02, 0.98, '', transform=self.ax6.transAxes,
+                                              fontsize=10, verticalalignment='top',
+                                              bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+        self.ax6_waiting = self.ax6.text(0.5, 0.5, 'Collecting data...',
+                                         transform=self.ax6.transAxes, **waiting)
+        self.ax6.set_title('Training Progress', fontweight='bold')
+        self.ax6.set_xlabel('Game Number')
+        self.ax6.set_ylabel('Record Broken (1=Yes, 0=No)')
+        self.ax6.set_ylim(-0.1, 1.1)
+        self.ax6.grid(True, alpha=0.3)
+
+    @staticmethod
+    def _rescale(ax, top):
+        # x follows the data; y starts at 0
+        ax.relim()
+        ax.autoscale_view(scaley=False)
+        ax.set_ylim(0, max(1, top) * 1.05)
+
+    def _update_scores(self):
+        """Individual game scores"""
+        has_data = len(self.scores) > 0
+        self.ax1_waiting.set_visible(not has_data)
+        self.ax1_legend.set_visible(has_data)
+        if has_data:
+            self.score_line.set_data(self.game_numbers, self.scores)
+            self.record_line.set_data(self.game_numbers, self.records)
+            self._rescale(self.ax1, max(max(self.scores), max(self.records)))
+
+    def _update_mean_scores(self):
+        """Mean scores over time"""
+        has_data = len(self.mean_scores) > 0
+        self.ax2_waiting.set_visible(not has_data)
+        self.ax2_legend.set_visible(has_data)
+        if has_data:
+            self.mean_line.set_data(self.game_numbers, self.mean_scores)
+            self.best_mean_line.set_ydata([self.best_mean_score, self.best_mean_score])
+            self.best_mean_line.set_visible(self.best_mean_score > 0)
+            self.ax2_legend.get_texts()[1].set_text(f'Best Mean: {self.best_mean_score:.1f}')
+            self._rescale(self.ax2, max(max(self.mean_scores), self.best_mean_score))
+
+    def _update_statistics(self):
+        """Key statistics as text"""
         # Safely get current score and mean score
         current_score = self.scores[-1] if len(self.scores) > 0 else 0
         current_mean = self.mean_scores[-1] if len(self.mean_scores) > 0 else 0.0
-        
+
         # Check improvement
         if len(self.mean_scores) > 10:
             improvement = '↑' if self.mean_scores[-1] > self.mean_scores[-10] else '↓'
         else:
             improvement = '-'
-        
+
         stats_text = f"""
         TRAINING STATISTICS
         {'='*30}
-        
+
         Total Games: {self.total_games}
         Current Score: {current_score}
         Record Score: {self.current_record}
         Mean Score: {current_mean:.2f}
         Best Mean: {self.best_mean_score:.2f}
-        
+
         Total Food Eaten: {self.total_food_eaten}
         Avg Food/Game: {self.total_food_eaten/max(1, self.total_games):.2f}
-        
-        Exploration Rate (ε): {max(0, epsilon):.1f}
-        Memory Size: {memory_size:,}
-        
+
+        Exploration Rate (ε): {max(0, self.epsilon):.1f}
+        Memory Size: {self.memory_size:,}
+
         Improvement: {improvement}
         """
-        
-        self.ax3.text(0.1, 0.5, stats_text, fontsize=11, family='monospace',
-                      verticalalignment='center', bbox=dict(boxstyle='round', 
-                      facecolor='wheat', alpha=0.5))
-        self.ax3.set_title('Live Statistics', fontweight='bold')
-        
-    def _plot_recent_scores(self):
+        self.stats_text.set_text(stats_text)
+
+    def _update_recent_scores(self):
         """Bar chart of recent scores"""
-        if len(self.scores) > 0:
-            recent_scores = self.scores[-20:] if len(self.scores) >= 20 else self.scores
-            recent_games = self.game_numbers[-20:] if len(self.game_numbers) >= 20 else self.game_numbers
-            
-            colors = ['green' if s >= self.current_record * 0.8 else 'blue' if s >= self.current_record * 0.5 else 'red' 
-                     for s in recent_scores]
-            
-            self.ax4.bar(range(len(recent_scores)), recent_scores, color=colors, alpha=0.7)
-            self.ax4.axhline(y=self.current_record, color='red', linestyle='--', 
-                           linewidth=2, label=f'Record: {self.current_record}')
-            self.ax4.set_title('Recent 20 Games', fontweight='bold')
-            self.ax4.set_xlabel('Recent Games')
-            self.ax4.set_ylabel('Score')
-            self.ax4.legend()
-            self.ax4.grid(True, alpha=0.3, axis='y')
-            self.ax4.set_ylim(ymin=0)
-        
-    def _plot_score_distribution(self):
+        recent_scores = list(self.scores)[-20:]
+        self.ax4_legend.set_visible(len(recent_scores) > 0)
+        self.recent_record_line.set_visible(len(recent_scores) > 0)
+        for i, bar in enumerate(self.recent_bars):
+            s = recent_scores[i] if i < len(recent_scores) else 0
+            bar.set_height(s)
+            bar.set_color('green' if s >= self.current_record * 0.8 else
+                          'blue' if s >= self.current_record * 0.5 else 'red')
+        self.recent_record_line.set_ydata([self.current_record, self.current_record])
+        self.ax4_legend.get_texts()[0].set_text(f'Record: {self.current_record}')
+        self.ax4.set_ylim(0, max(1, self.current_record, max(recent_scores, default=0)) * 1.1)
+
+    def _update_score_distribution(self):
         """Histogram of score distribution"""
-        if len(self.scores) >= 10:
-            bins = min(15, max(5, len(set(self.scores))))
-            self.ax5.hist(self.scores, bins=bins, color='skyblue', edgecolor='black', alpha=0.7)
-            self.ax5.axvline(x=np.mean(self.scores), color='red', linestyle='--', 
-                           linewidth=2, label=f'Mean: {np.mean(self.scores):.1f}')
-            self.ax5.axvline(x=np.median(self.scores), color='green', linestyle='--', 
-                           linewidth=2, label=f'Median: {np.median(self.scores):.1f}')
-            self.ax5.set_title('Score Distribution', fontweight='bold')
-            self.ax5.set_xlabel('Score')
-            self.ax5.set_ylabel('Frequency')
-            self.ax5.legend()
-            self.ax5.grid(True, alpha=0.3, axis='y')
+        n = int(self.score_counts.sum())
+        has_data = n >= 10
+        self.ax5_waiting.set_visible(not has_data)
+        for artist in (self.hist, self.mean_vline, self.median_vline, self.ax5_legend):
+            artist.set_visible(has_data)
+        if has_data:
+            # Same bins as np.histogram(all_scores, bins), computed from the counts
+            seen = np.flatnonzero(self.score_counts)
+            bins = min(15, max(5, len(seen)))
+            values = np.arange(seen[0], seen[-1] + 1)
+            counts, edges = np.histogram(values, bins=bins,
+                                         weights=self.score_counts[seen[0]:seen[-1] + 1])
+            self.hist.set_data(counts, edges)
+            cumulative = np.cumsum(self.score_counts)
+            mean = (np.arange(len(self.score_counts)) * self.score_counts).sum() / n
+            median = np.searchsorted(cumulative, [(n - 1) // 2, n // 2], side='right').mean()
+            self.mean_vline.set_xdata([mean, mean])
+            self.median_vline.set_xdata([median, median])
+            self.ax5_legend.get_texts()[0].set_text(f'Mean: {mean:.1f}')
+            self.ax5_legend.get_texts()[1].set_text(f'Median: {median:.1f}')
+            self.ax5.set_xlim(edges[0], edges[-1])
+            self.ax5.set_ylim(0, counts.max() * 1.1)
+
+    def _update_training_metrics(self):
+        """Training progress metrics"""
+        has_data = len(self.game_numbers) >= 2
+        self.ax6_waiting.set_visible(not has_data)
+        for artist in (self.record_marks, self.ax6_legend, self.improvement_text):
+            artist.set_visible(has_data)
+        if not has_data:
+            return
+
+        # Calculate improvement rate
+        mean_scores = list(self.mean_scores)
+        if len(mean_scores) >= 20:
+            recent_improvement = np.mean(mean_scores[-10:]) - np.mean(mean_scores[-20:-10])
         else:
-            self.ax5.text(0.5, 0.5, 'Need more data\n(min 10 games)', 
-                         ha='center', va='center', fontsize=12)
-            self.ax5.set_title('Score Distribution', fontweight='bold')
-            self.ax5.axis('off')
-    
-    def _plot_training_metrics(self):
-        """Plot training progress metrics"""
-        if len(self.game_numbers) >= 2:
-            # Calculate improvement rate
-            if len(self.mean_scores) >= 10:
-                recent_improvement = np.mean(self.mean_scores[-10:]) - np.mean(self.mean_scores[-20:-10]) if len(self.mean_scores) >= 20 else 0
-            else:
-                recent_improvement = 0
-            
-            # Plot record progression
-            record_changes = []
-            prev_record = 0
-            for r in self.records:
-                if r > prev_record:
-                    record_changes.append(1)
-                    prev_record = r
-                else:
-                    record_changes.append(0)
-            
-            self.ax6.plot(self.game_numbers, record_changes, 'go-', markersize=8, 
-                         label='Record Broken', linewidth=0)
-            self.ax6.set_title('Training Progress', fontweight='bold')
-            self.ax6.set_xlabel('Game Number')
-            self.ax6.set_ylabel('Record Broken (1=Yes, 0=No)')
-            self.ax6.set_ylim(-0.1, 1.1)
-            self.ax6.legend()
-            self.ax6.grid(True, alpha=0.3)
-            
-            # Add text annotation
-            if recent_improvement > 0:
-                improvement_text = f"↑ Improving: +{recent_improvement:.2f}"
-                color = 'green'
+            recent_improvement = 0
+
+        # Plot record progression
+        record_changes = []
+        prev_record = 0
+        for r in self.records:
+            if r > prev_record:
+                record_changes.append(1)
+                prev_record = r
             else:
-                improvement_text = f"↓ Stable: {recent_improvement:.2f}"
-                color = 'orange'
-            
-            self.ax6.text(0.02, 0.98, improvement_text, transform=self.ax6.transAxes,
-                         fontsize=10, verticalalignment='top', color=color,
-                         bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+                record_changes.append(0)
+        self.record_marks.set_data(self.game_numbers, record_changes)
+        self.ax6.set_xlim(self.game_numbers[0] - 1, self.game_numbers[-1] + 1)
+
+        if recent_improvement > 0:
+            self.improvement_text.set_text(f"↑ Improving: +{recent_improvement:.2f}")
+            self.improvement_text.set_color('green')
         else:
-            self.ax6.text(0.5, 0.5, 'Collecting data...', 
-                         ha='center', va='center', fontsize=12)
-            self.ax6.set_title('Training Progress', fontweight='bold')
-            self.ax6.axis('off')
-    
+            self.improvement_text.set_text(f"↓ Stable: {recent_improvement:.2f}")
+            self.improvement_text.set_color('orange')
+
     def close(self):
-        """Close the visualization"""
+        """Draw any pending update, then close the visualization"""
+        if self._dirty:
+            self.redraw()
         plt.close(self.fig)
-